@@ -3,11 +3,11 @@ from files.models import TorrentFile, MtCategory
 
 # Register your models here.
 
-NO_SEARCH_FIELDS = {'created_at', 'modified_at', "uploadTime", "location", "id"}
+NO_SEARCH_FIELDS = {'created_at', 'modified_at', "uploadTime", "location", "location_key", "id"}
 
-UNEDITABLE_FIELDS = {'created_at', 'modified_at', "uploadTime", "id"}
+UNEDITABLE_FIELDS = {'created_at', 'modified_at', "uploadTime", "location_key", "id"}
 
-NO_FILTER_FIELDS = {"uploadTime", "location", "id"}
+NO_FILTER_FIELDS = {"uploadTime", "location", "location_key", "id"}
 
 MODELS = (TorrentFile, MtCategory)
 
@@ -5,6 +5,9 @@ urlpatterns = [
     url(r'^auth/login/$', api_views.api_login, name='api_login'),
     url(r'^links/$', api_views.TorrentFileListCreateView.as_view(), name='api_links'),
     url(r'^links/bulk/$', api_views.bulk_create_links, name='api_bulk_links'),
+    url(r'^links/import/$', api_views.import_links, name='api_import_links'),
+    url(r'^links/jobs/(?P<pk>\d+)/$', api_views.link_submission, name='api_link_submission'),
+    url(r'^suggest/$', api_views.suggest, name='api_suggest'),
     url(r'^categories/$', api_views.CategoryListView.as_view(), name='api_categories'),
     url(r'^info/$', api_views.api_info, name='api_info'),
 ]
\ No newline at end of file
@@ -1,12 +1,47 @@
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from rest_framework import generics, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from .models import TorrentFile, MtCategory
-from .serializers import TorrentFileSerializer, BulkTorrentFileSerializer, MtCategorySerializer
+from .categories import category_registry
+from .conditional import listing_validators, not_modified, set_validators
+from .importer import LinkImporter, iter_lines, stream_results
+from .models import TorrentFile, MtCategory, LinkSubmission
+from .pagination import DEFAULT_ORDERING, KeysetPagination
+from .serializers import (
+    TorrentFileSerializer, BulkTorrentFileSerializer, MtCategorySerializer,
+    QueuedLinkSerializer, QueuedBulkLinksSerializer, LinkSubmissionSerializer,
+)
+from .sorting import SORT_ORDERINGS, sort_ordering
+from .suggest import DEFAULT_LIMIT, MAX_LIMIT, suggest_categories, suggest_index
+from .throttling import (
+    BulkPostIPThrottle, BulkPostTokenThrottle, LinkPostIPThrottle, LinkPostTokenThrottle, SuggestIPThrottle,
+)
+
+
+def wants_async(request):
+    return request.query_params.get('async', '').lower() in ('1', 'true', 'yes')
+
+
+def queue_links(request, serializer_class):
+    """Queue the posted links for the process_link_submissions worker and answer 202 Accepted."""
+    serializer = serializer_class(data=request.data, context={'request': request})
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    submission = serializer.save()
+    status_url = reverse('api_link_submission', args=[submission.id])
+    return Response({
+        'job_id': submission.id,
+        'status': submission.status,
+        'status_url': request.build_absolute_uri(status_url),
+    }, status=status.HTTP_202_ACCEPTED, headers={'Location': status_url})
 
 
 @api_view(['POST'])
@@ -54,24 +89,91 @@ class TorrentFileListCreateView(generics.ListCreateAPIView):
     """
     List all torrent files for the authenticated user or create a new one.
     
-    GET /api/links/
-    - Lists all links posted by the authenticated user
+    GET /api/links/?page_size=20&fields=id,location&sort=name
+    - Lists the links posted by the authenticated user, newest first, one
+      page at a time; follow "next" for older links
+    - fields limits both the serialized fields and the columns fetched
+    - sort orders by category, name, uploadTime or uploader, "-" first
+      for descending; anything else is a 400
     
     POST /api/links/
     {
         "location": "fopnu://file:/path/to/file",
         "category_id": 1  // optional
     }
+
+    POST /api/links/?async=1 queues the link instead; see link_submission.
     """
     serializer_class = TorrentFileSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [LinkPostTokenThrottle, LinkPostIPThrottle]
+    pagination_class = KeysetPagination
+
+    # Readable serializer fields and the model columns they need
+    FIELD_COLUMNS = {
+        'id': 'id',
+        'name': 'name',
+        'location': 'location',
+        'uploader': 'uploader',
+        'uploadTime': 'uploadTime',
+        'category': 'category',
+    }
+
+    def requested_fields(self):
+        """Field names asked for with ?fields=, or None for all of them."""
+        param = self.request.query_params.get('fields')
+        if self.request.method != 'GET' or not param:
+            return None
+        fields = [name for name in param.split(',') if name in self.FIELD_COLUMNS]
+        return fields or None
+
+    def get_ordering(self):
+        """The ordering asked for with ?sort=, newest first without one."""
+        sort = self.request.query_params.get('sort')
+        if not sort:
+            return DEFAULT_ORDERING
+        ordering = sort_ordering(sort)
+        if ordering is None:
+            choices = ', '.join(sorted(SORT_ORDERINGS))
+            raise ValidationError({'sort': ['Sort by one of %s, prefixed with "-" for descending order.' % choices]})
+        return ordering
 
     def get_queryset(self):
-        return TorrentFile.objects.filter(uploader=self.request.user.username).order_by('-uploadTime')
+        ordering = self.get_ordering()
+        queryset = TorrentFile.objects.owned_by(self.request.user).order_by(*ordering)
+        fields = self.requested_fields()
+        if fields is None:
+            return queryset.listing()
+        if 'category' in fields:
+            queryset = queryset.listing()
+        # The pagination key is always needed
+        columns = {TorrentFile._meta.get_field(name.lstrip('-')).name for name in ordering}
+        columns |= {self.FIELD_COLUMNS[name] for name in fields}
+        return queryset.only(*columns)
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.requested_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        if wants_async(request):
+            return queue_links(request, QueuedLinkSerializer)
+        return super().create(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        etag = listing_validators(self.get_queryset())
+        response = not_modified(request, etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+            set_validators(response, etag)
+        return response
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([BulkPostTokenThrottle, BulkPostIPThrottle])
 def bulk_create_links(request):
     """
     Create multiple torrent file links at once.
@@ -95,7 +197,11 @@ def bulk_create_links(request):
         ],
         "count": 3
     }
+
+    POST /api/links/bulk/?async=1 queues the links instead; see link_submission.
     """
+    if wants_async(request):
+        return queue_links(request, QueuedBulkLinksSerializer)
     serializer = BulkTorrentFileSerializer(data=request.data, context={'request': request})
     
     if serializer.is_valid():
@@ -109,16 +215,114 @@ def bulk_create_links(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([BulkPostTokenThrottle, BulkPostIPThrottle])
+def import_links(request):
+    """
+    Stream a large number of links in, one per line.
+
+    POST /api/links/import/?category_id=1&chunk_size=500
+    fopnu://file:/path/to/file1
+    {"location": "fopnu://file:/path/to/file2", "category_id": 2}
+    ...
+
+    Lines are committed in chunks and a result is streamed back as NDJSON
+    for every input line:
+    {"line": 1, "location": "...", "status": "created", "id": 10}
+    {"line": 2, "location": "...", "status": "duplicate", "existing_id": 3}
+    {"line": 3, "status": "invalid", "error": "..."}
+    """
+    category = None
+    category_id = request.query_params.get('category_id')
+    if category_id:
+        try:
+            category = MtCategory.objects.get(id=category_id)
+        except (MtCategory.DoesNotExist, ValueError):
+            return Response({
+                'category_id': [f'Invalid pk "{category_id}" - object does not exist.']
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        chunk_size = int(request.query_params.get('chunk_size', settings.LINK_IMPORT_CHUNK_SIZE))
+    except ValueError:
+        chunk_size = settings.LINK_IMPORT_CHUNK_SIZE
+    chunk_size = max(1, min(chunk_size, settings.BULK_LINKS_MAX_BATCH))
+
+    importer = LinkImporter(request.user, category, chunk_size)
+    results = importer.run(iter_lines(request.stream))
+    return StreamingHttpResponse(stream_results(results), content_type='application/x-ndjson')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def link_submission(request, pk):
+    """
+    Report on links queued with ?async=1.
+
+    GET /api/links/jobs/<job_id>/
+
+    Returns:
+    {
+        "id": 7,
+        "status": "done",  // pending, processing, done or failed
+        "summary": {"created": 1, "duplicate": 1},
+        "results": [
+            {"index": 1, "location": "...", "status": "created", "id": 10},
+            {"index": 2, "location": "...", "status": "duplicate", "existing_id": 3}
+        ],
+        "error": "",
+        ...
+    }
+    """
+    submission = get_object_or_404(LinkSubmission, pk=pk, user=request.user)
+    return Response(LinkSubmissionSerializer(submission).data)
+
+
 class CategoryListView(generics.ListAPIView):
     """
     List all available categories.
     
     GET /api/categories/
+    - Served from the category registry; send If-None-Match with the
+      returned ETag to get 304 Not Modified while nothing has changed
     """
     queryset = MtCategory.objects.all().order_by('name')
     serializer_class = MtCategorySerializer
     permission_classes = [IsAuthenticated]
 
+    def list(self, request, *args, **kwargs):
+        categories = category_registry.all()
+        etag = '"categories-%s"' % category_registry.version
+        response = not_modified(request, etag)
+        if response is None:
+            serializer = self.get_serializer(categories, many=True)
+            response = set_validators(Response(serializer.data), etag)
+        return response
+
+
+@api_view(['GET'])
+@permission_classes([])
+@throttle_classes([SuggestIPThrottle])
+def suggest(request):
+    """
+    Complete what is typed into the search box.
+
+    GET /api/suggest/?q=mov&limit=10
+    - Newest links, and categories, where every word of q starts a word
+      of the name; served from files.suggest without a query
+    """
+    query = request.query_params.get('q', '')
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    return Response({
+        'query': query,
+        'links': [{'id': pk, 'name': name} for pk, name in suggest_index.suggest(query, limit)],
+        'categories': MtCategorySerializer(suggest_categories(query, limit), many=True).data,
+    })
+
 
 @api_view(['GET'])
 @permission_classes([])
@@ -142,13 +346,17 @@ def api_info(request):
             'list_user_links': 'GET /api/links/',
             'create_single_link': 'POST /api/links/',
             'create_bulk_links': 'POST /api/links/bulk/',
+            'import_links': 'POST /api/links/import/',
+            'link_submission_status': 'GET /api/links/jobs/<job_id>/',
             'list_categories': 'GET /api/categories/',
+            'suggest': 'GET /api/suggest/?q=<typed text>',
             'api_info': 'GET /api/info/'
         },
         'usage_example': {
             'step1': 'Login: POST /api/auth/login/ with {"username": "user", "password": "pass"}',
             'step2': 'Get token from response',
             'step3': 'Use token in Authorization header for subsequent requests',
-            'step4': 'Post links: POST /api/links/ or /api/links/bulk/ with link data'
+            'step4': 'Post links: POST /api/links/ or /api/links/bulk/ with link data',
+            'step5': 'Add ?async=1 to queue the links and poll the returned status_url for the results'
         }
     })
\ No newline at end of file
@@ -1,5 +1,18 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class FilesConfig(AppConfig):
     name = 'files'
+
+    def ready(self):
+        from files import signals  # noqa: F401
+        from files.search import ensure_search_index
+
+        from unchainedTorrent.database import close_unusable_connections, configure_sqlite
+
+        post_migrate.connect(ensure_search_index, sender=self)
+        connection_created.connect(configure_sqlite)
+        request_started.connect(close_unusable_connections)
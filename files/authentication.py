@@ -0,0 +1,94 @@
+"""
+Token authentication with an in-process cache of recently used tokens.
+
+API clients send the same few tokens over and over, so each process keeps a
+bounded LRU of token key -> Token (with its user) that expires entries after
+TOKEN_AUTH_CACHE_TTL seconds. Token changes and users being deactivated or
+deleted bump a version kept in the listing cache, which empties the LRU in
+every process sharing that cache; see files.signals. With a process-local
+cache (the CACHE_URL default) only the process that made the change empties
+its LRU, and the others keep honouring a deleted or rotated token, or a
+deactivated user, until its entry expires.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from files.cache import bump_version, get_version
+from files.metrics import record_cache
+
+VERSION_KEY = 'tokens:version'
+
+
+class TokenCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+
+    @property
+    def version(self):
+        return get_version(VERSION_KEY)
+
+    def invalidate(self, **kwargs):
+        """Forget every cached token everywhere. Usable directly as a signal receiver."""
+        bump_version(VERSION_KEY)
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key):
+        """The cached Token for ``key``, or None when absent, expired or out of date."""
+        version = self.version
+        with self._lock:
+            if self._version != version:
+                self._entries.clear()
+                self._version = version
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, key, token):
+        version = self.version
+        with self._lock:
+            if self._version != version:
+                self._entries.clear()
+                self._version = version
+            self._entries[key] = (token, time.monotonic() + settings.TOKEN_AUTH_CACHE_TTL)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_AUTH_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in replacement for TokenAuthentication that skips the database for recently seen tokens."""
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        record_cache('tokens', token is not None)
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            token_cache.set(key, token)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
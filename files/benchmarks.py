@@ -0,0 +1,206 @@
+"""
+Benchmarks for the web and API hot paths, run by the benchmark_hot_paths command.
+
+seed_catalog() fills the database with a synthetic catalog and
+run_benchmarks() sends requests through the full middleware stack with the
+test client, recording latency percentiles, throughput and query counts for
+each endpoint. Results are plain dicts so they can be written as JSON and
+compared between commits with compare_results().
+"""
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from files.counters import rebuild_counters
+from files.linkparse import normalize_location
+from files.models import TorrentFile, MtCategory
+
+CATEGORIES = ('movies', 'music', 'tv', 'software', 'books', 'games', 'anime', 'other')
+WORDS = (
+    'night', 'live', 'remastered', 'season', 'extended', 'soundtrack', 'collection', 'deluxe',
+    'ocean', 'winter', 'empire', 'shadow', 'garden', 'signal', 'harbor', 'rocket', 'silver', 'forest',
+)
+EXTENSIONS = ('.mkv', '.mp4', '.flac', '.mp3', '.zip', '.pdf', '.iso')
+USERNAME_FORMAT = 'bench%05d'
+
+# Every request is let through; the throttles are not what is being measured
+UNTHROTTLED = {scope: '1000000/d' for scope in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']}
+
+SIZES = {'k': 1000, 'm': 1000 * 1000}
+
+
+def parse_size(value):
+    """'10k' -> 10000, '1m' -> 1000000, '250' -> 250."""
+    value = value.strip().lower()
+    if value[-1:] in SIZES:
+        return int(float(value[:-1]) * SIZES[value[-1]])
+    return int(value)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def seed_catalog(rows, users=1000, batch_size=10000, seed=1, progress=None):
+    """
+    Insert ``rows`` links spread over ``users`` uploaders and the usual
+    categories, uploaded over the last three years, then rebuild the
+    counters. The first user is the one the benchmarks log in as.
+    """
+    rng = random.Random(seed)
+    User.objects.bulk_create(
+        [User(username=USERNAME_FORMAT % number, password=make_password(None)) for number in range(users)],
+        batch_size=batch_size,
+    )
+    uploaders = list(User.objects.filter(username__startswith='bench').order_by('id').only('id', 'username'))
+    MtCategory.objects.bulk_create([MtCategory(name=name) for name in CATEGORIES])
+    categories = list(MtCategory.objects.all())
+
+    now = timezone.now()
+    span = 3 * 365 * 24 * 3600
+    for start in range(0, rows, batch_size):
+        links = []
+        for number in range(start, min(rows, start + batch_size)):
+            # Skew uploads towards a few busy users, as on the live site
+            uploader = uploaders[int(len(uploaders) * rng.random() ** 3)]
+            name = ' '.join(rng.sample(WORDS, rng.randint(2, 5))) + rng.choice(EXTENSIONS)
+            location = 'fopnu://file:/%s/%d/%s' % (uploader.username, number, name)
+            links.append(TorrentFile(
+                name=name,
+                location=location,
+                location_key=normalize_location(location),
+                uploader=uploader.username,
+                uploader_user=uploader,
+                uploadTime=now - timedelta(seconds=rng.randrange(span)),
+                category=rng.choice(categories),
+            ))
+        TorrentFile.objects.bulk_create(links)
+        if progress:
+            progress(start + len(links))
+    rebuild_counters()
+
+
+class Benchmark:
+    """Sends one kind of request ``count`` times and summarizes how it went."""
+
+    def __init__(self, name, method, url, expected_status, data=None, api=False):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.expected_status = expected_status
+        self.data = data
+        self.api = api
+
+    def request(self, client, number):
+        url = self.url(number) if callable(self.url) else self.url
+        kwargs = {}
+        if self.data is not None:
+            kwargs['data'] = self.data(number)
+            if self.api:
+                kwargs['content_type'] = 'application/json'
+        return getattr(client, self.method)(url, **kwargs)
+
+    def run(self, client, count, warmup):
+        for number in range(warmup):
+            self.request(client, -1 - number)
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for number in range(count):
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = self.request(client, number)
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(len(captured))
+            if response.status_code != self.expected_status:
+                errors += 1
+        elapsed = time.perf_counter() - started
+        return {
+            'requests': count,
+            'errors': errors,
+            'throughput_rps': count / elapsed if elapsed else 0.0,
+            'latency_ms': {
+                'mean': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+                'p50': percentile(latencies, 0.50) * 1000,
+                'p95': percentile(latencies, 0.95) * 1000,
+                'p99': percentile(latencies, 0.99) * 1000,
+                'max': max(latencies, default=0.0) * 1000,
+            },
+            'queries': {
+                'mean': sum(queries) / len(queries) if queries else 0.0,
+                'max': max(queries, default=0),
+            },
+        }
+
+
+def hot_paths(bulk_size, run_id):
+    """The benchmarked endpoints. Links posted by the write benchmarks are unique per ``run_id``."""
+    def location(kind, number):
+        return 'fopnu://file:/benchmark/%s/%s/%d.mkv' % (run_id, kind, number)
+
+    def search_url(number):
+        return '%s?q=%s' % (reverse('search'), WORDS[number % len(WORDS)])
+
+    return [
+        Benchmark('index', 'get', reverse('home'), 200),
+        Benchmark('search', 'get', search_url, 200),
+        Benchmark('profile', 'get', reverse('profile'), 200),
+        Benchmark('get_name', 'post', reverse('upload'), 302, data=lambda number: {
+            'location': location('upload', number),
+        }),
+        Benchmark('api_links', 'get', reverse('api_links'), 200, api=True),
+        Benchmark('api_bulk', 'post', reverse('api_bulk_links'), 201, api=True, data=lambda number: {
+            'links': [location('bulk-%d' % number, link) for link in range(bulk_size)],
+        }),
+    ]
+
+
+def run_benchmarks(count=200, warmup=10, bulk_size=100, only=None):
+    """Run every hot-path benchmark (or those named in ``only``) as the first catalog user."""
+    user = User.objects.filter(username=USERNAME_FORMAT % 0).first() or User.objects.order_by('id').first()
+    token, _ = Token.objects.get_or_create(user=user)
+    web = Client()
+    web.force_login(user)
+    api = Client(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    results = {}
+    throttles = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': UNTHROTTLED}
+    with override_settings(REST_FRAMEWORK=throttles, DATABASE_REPLICAS=[]):
+        cache.clear()
+        for benchmark in hot_paths(bulk_size, run_id=int(time.time() * 1000)):
+            if only and benchmark.name not in only:
+                continue
+            client = api if benchmark.api else web
+            results[benchmark.name] = benchmark.run(client, count, warmup)
+    return results
+
+
+def compare_results(before, after):
+    """Rows of (endpoint, metric, before, after, change in %) for endpoints in both result sets."""
+    rows = []
+    for name, current in after['results'].items():
+        previous = before['results'].get(name)
+        if previous is None:
+            continue
+        for metric, old, new in (
+            ('p50 ms', previous['latency_ms']['p50'], current['latency_ms']['p50']),
+            ('p95 ms', previous['latency_ms']['p95'], current['latency_ms']['p95']),
+            ('req/s', previous['throughput_rps'], current['throughput_rps']),
+            ('queries', previous['queries']['mean'], current['queries']['mean']),
+        ):
+            change = (new - old) / old * 100 if old else 0.0
+            rows.append((name, metric, old, new, change))
+    return rows
@@ -0,0 +1,108 @@
+"""
+Whole-response caching for the public listing pages.
+
+Entries are keyed on a listing version that every TorrentFile or
+MtCategory change bumps (see files.signals), so a cached page is served
+until the data behind it changes rather than for a fixed time.
+
+The listing cache also holds the version counters of the other per-process
+caches (categories, tokens, suggestions); get_versions() and bump_version()
+keep them all the same way.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response
+
+from files.metrics import record_cache
+from unchainedTorrent.routers import reads_from_primary
+
+VERSION_KEY = 'listing:version'
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+def get_listing_cache():
+    return caches[settings.LISTING_CACHE_ALIAS]
+
+
+def get_versions(*keys):
+    """The version counters at ``keys`` in the listing cache, in order, starting any that are missing."""
+    cache = get_listing_cache()
+    values = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if values.get(key) is None:
+            # Start from the clock so a restarted cache never repeats an old version (and ETag).
+            # A process-local cache forgets them with its pages, so other processes' changes show eventually.
+            cache.add(key, int(time.time() * 1000), timeout=settings.LISTING_CACHE_TIMEOUT)
+            values[key] = cache.get(key)
+        versions.append(values[key])
+    return versions
+
+
+def get_version(key):
+    return get_versions(key)[0]
+
+
+def bump_version(key):
+    """Move the counter at ``key`` on, for every process sharing the listing cache."""
+    try:
+        get_listing_cache().incr(key)
+    except ValueError:
+        get_version(key)
+
+
+def get_listing_version():
+    return get_version(VERSION_KEY)
+
+
+def bump_listing_version(**kwargs):
+    """Invalidate every cached listing page. Usable directly as a signal receiver."""
+    bump_version(VERSION_KEY)
+
+
+def listing_cache_key(request, view_name):
+    params = sorted((key, sorted(values)) for key, values in request.GET.lists())
+    digest = hashlib.md5(repr(params).encode()).hexdigest()
+    return 'listing:%s:%s:%s' % (get_listing_version(), view_name, digest)
+
+
+def cache_anonymous_listing(view):
+    """
+    Serve ``view`` from the listing cache for anonymous GET and HEAD requests.
+    Logged-in users always get a freshly rendered page.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        cache = get_listing_cache()
+        key = listing_cache_key(request, view.__name__)
+        cached = cache.get(key)
+        record_cache('listing', cached is not None)
+        if cached is not None:
+            content, headers = cached
+            # The entry dies with the data, so its validators are still current
+            etag = headers.get('ETag')
+            if etag and get_conditional_response(request, etag=etag) is not None:
+                response = HttpResponseNotModified()
+                headers.pop('Content-Type', None)
+            else:
+                response = HttpResponse(content)
+            for header, value in headers.items():
+                response[header] = value
+            return response
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            headers = {header: response[header] for header in CACHED_HEADERS if response.has_header(header)}
+            # A lagging replica may have rendered data older than the version in the key
+            timeout = settings.LISTING_CACHE_TIMEOUT if reads_from_primary() else settings.REPLICA_PIN_SECONDS
+            cache.set(key, (response.content, headers), timeout)
+        return response
+    return wrapper
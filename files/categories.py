@@ -0,0 +1,65 @@
+"""
+In-process registry of categories.
+
+Categories are read on almost every page and change rarely, so the sorted
+list is loaded once per process and reused until its version moves. The
+version lives in the listing cache so that every process sharing that cache
+notices a change made by any of them; MtCategory signals bump it.
+"""
+import threading
+
+from django.db import DEFAULT_DB_ALIAS
+
+from files.cache import bump_version, get_version
+from files.metrics import record_cache
+from files.models import MtCategory
+
+VERSION_KEY = 'categories:version'
+
+
+class CategoryRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._categories = []
+
+    @property
+    def version(self):
+        return get_version(VERSION_KEY)
+
+    def invalidate(self, **kwargs):
+        """Drop the loaded list everywhere. Usable directly as a signal receiver."""
+        bump_version(VERSION_KEY)
+        with self._lock:
+            self._version = None
+
+    def all(self):
+        """Every category ordered by name, as a list."""
+        version = self.version
+        with self._lock:
+            hit = self._version == version
+            if not hit:
+                # Kept until the version moves, so never from a lagging replica
+                self._categories = list(MtCategory.objects.using(DEFAULT_DB_ALIAS).order_by('name'))
+                self._version = version
+            categories = self._categories
+        record_cache('categories', hit)
+        return categories
+
+    def get(self, category_id):
+        """The category with ``category_id`` (int or numeric string), or None."""
+        try:
+            category_id = int(category_id)
+        except (TypeError, ValueError):
+            return None
+        for category in self.all():
+            if category.id == category_id:
+                return category
+        return None
+
+    def choices(self, empty_label='---------'):
+        """(id, label) pairs for a category <select>, matching ModelChoiceField."""
+        return [('', empty_label)] + [(category.id, str(category)) for category in self.all()]
+
+
+category_registry = CategoryRegistry()
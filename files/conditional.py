@@ -0,0 +1,82 @@
+"""
+Conditional GET (ETag) for link listings.
+
+The web listings take their ETag from versions that signals bump on every
+change (files.cache.get_listing_version and the category registry) plus the
+viewing user, so answering 304 costs no query over the links. Pages read
+from a replica get no ETag, since they may predate those versions. The API
+listing of one user's links is narrowed by an index, so its ETag comes from
+an aggregate over those rows instead: the newest ``modified_at`` catches
+inserts and edits, the row count catches deletes.
+
+No Last-Modified is sent: neither source moves it back when a row or a
+category is deleted, so If-Modified-Since alone would confirm stale copies.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+
+from files.cache import get_listing_version
+from files.categories import category_registry
+from unchainedTorrent.routers import reads_from_primary
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def listing_validators(queryset, *extra):
+    """
+    Return the ETag for ``queryset`` from an aggregate over its rows. Only for
+    querysets an index narrows down, such as one user's links.
+    """
+    stats = queryset.order_by().aggregate(last_modified=Max('modified_at'), count=Count('id'))
+    last_modified = stats['last_modified']
+    return make_etag(last_modified.isoformat() if last_modified else '', stats['count'],
+                     category_registry.version, *extra)
+
+
+def version_validators(*extra):
+    """Return the ETag for a page built from the links and categories, without a query over them."""
+    return make_etag(get_listing_version(), category_registry.version, *extra)
+
+
+def set_validators(response, etag):
+    response['ETag'] = etag
+    return response
+
+
+def not_modified(request, etag):
+    """The 304 response for ``request`` if the client's copy is current, otherwise None."""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_validators(response, etag)
+    return response
+
+
+def conditional_listing(extra_for=None):
+    """
+    Answer GET requests to a listing view with 304 while no link or category
+    has changed. The optional ``extra_for(request)`` returns more values to
+    mix into the ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            extra = extra_for(request) if extra_for is not None else []
+            etag = version_validators(request.user.pk, *extra)
+            response = not_modified(request, etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                # A lagging replica may have rendered data older than the versions in the ETag
+                if response.status_code == 200 and reads_from_primary():
+                    set_validators(response, etag)
+            return response
+        return wrapper
+    return decorator
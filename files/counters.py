@@ -0,0 +1,105 @@
+"""
+Denormalized link counts per category, uploader and upload day.
+
+TorrentFile signals (see files.signals) adjust the counters as links are
+added, deleted or edited, so pages can show totals without a GROUP BY over
+the whole table. Writes that skip signals, such as QuerySet.update() or raw
+SQL, leave them stale until rebuild_counters() (or the rebuild_link_counters
+command) recounts from scratch.
+"""
+from collections import Counter
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from files.models import CategoryLinkCount, DailyLinkCount, UploaderLinkCount
+
+
+def upload_day(value):
+    """The calendar day, in the current time zone, that counts an upload."""
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date()
+
+
+def counter_keys(category_id, uploader, upload_time):
+    """(counter model, primary key) of every counter a link with these values adds to."""
+    keys = [(UploaderLinkCount, uploader), (DailyLinkCount, upload_day(upload_time))]
+    if category_id is not None:
+        keys.append((CategoryLinkCount, category_id))
+    return keys
+
+
+def keys_for(torrent_file):
+    return counter_keys(torrent_file.category_id, torrent_file.uploader, torrent_file.uploadTime)
+
+
+def adjust_counters(deltas, using=None):
+    """
+    Apply ``deltas``, a mapping of (counter model, primary key) to the change
+    in its count. Counts are updated in place with F() so concurrent writers
+    do not lose increments, and never drop below zero.
+    """
+    # A fixed order keeps two transactions from locking the same rows the other way round
+    changes = sorted(
+        ((model, key, delta) for (model, key), delta in deltas.items() if delta),
+        key=lambda change: (change[0].__name__, str(change[1])),
+    )
+    with transaction.atomic(using=using):
+        for model, key, delta in changes:
+            counters = model.objects.using(using)
+            count = Greatest(F('count') + delta, Value(0))
+            if not counters.filter(pk=key).update(count=count) and delta > 0:
+                counters.get_or_create(pk=key)
+                counters.filter(pk=key).update(count=count)
+
+
+def count_added(torrent_files, using=None):
+    adjust_counters(Counter(key for torrent_file in torrent_files for key in keys_for(torrent_file)), using)
+
+
+def count_removed(torrent_files, using=None):
+    deltas = Counter()
+    for torrent_file in torrent_files:
+        deltas.subtract(keys_for(torrent_file))
+    adjust_counters(deltas, using)
+
+
+def total_links():
+    """Number of links in the table, summed over the per-day counters."""
+    return DailyLinkCount.objects.aggregate(total=Sum('count'))['total'] or 0
+
+
+def category_counts():
+    """{category id: number of links} for every category that has links."""
+    return dict(CategoryLinkCount.objects.values_list('category_id', 'count'))
+
+
+def category_facets(categories):
+    """(category, number of links) pairs for a category <select>, in the given order."""
+    counts = category_counts()
+    return [(category, counts.get(category.id, 0)) for category in categories]
+
+
+def rebuild_counters(using=None, models=global_apps):
+    """
+    Recount every counter from TorrentFile in one transaction. ``models`` is
+    an app registry, so migrations can pass their historical one.
+    """
+    links = models.get_model('files', 'TorrentFile').objects.using(using).order_by()
+    totals = (
+        ('CategoryLinkCount', 'category_id', links.filter(category__isnull=False).values('category_id')),
+        ('UploaderLinkCount', 'uploader', links.values('uploader')),
+        ('DailyLinkCount', 'day', links.annotate(day=TruncDate('uploadTime')).values('day')),
+    )
+    with transaction.atomic(using=using):
+        for model_name, field, grouped in totals:
+            model = models.get_model('files', model_name)
+            model.objects.using(using).all().delete()
+            model.objects.using(using).bulk_create(
+                model(**{field: row[field], 'count': row['count']})
+                for row in grouped.annotate(count=Count('id'))
+            )
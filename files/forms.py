@@ -1,5 +1,7 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from files.categories import category_registry
+from files.metrics import duplicates_rejected
 from files.models import TorrentFile, MtCategory
 
 
@@ -13,6 +15,7 @@ class TorrentFileForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super(TorrentFileForm, self).__init__(*args, **kwargs)
         self.fields['category'].queryset = MtCategory.objects.order_by('name')
+        self.fields['category'].choices = category_registry.choices()
     
     def clean_location(self):
         """Check for duplicate links"""
@@ -21,6 +24,7 @@ class TorrentFileForm(forms.ModelForm):
         # Check if this link already exists
         existing_file = TorrentFile.find_duplicate(location)
         if existing_file:
+            duplicates_rejected.inc(source='upload')
             raise ValidationError(
                 f'This link has already been posted by {existing_file.uploader} '
                 f'on {existing_file.uploadTime.strftime("%Y-%m-%d %H:%M")} '
@@ -41,4 +45,5 @@ class TorrentFileEditForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super(TorrentFileEditForm, self).__init__(*args, **kwargs)
         self.fields['category'].queryset = MtCategory.objects.order_by('name')
+        self.fields['category'].choices = category_registry.choices()
         self.fields['category'].label = 'Category'
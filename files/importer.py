@@ -0,0 +1,157 @@
+"""
+Streaming link import for /api/links/import/.
+
+The request body is read one line at a time and committed in chunks, and a
+result line is produced for every input line as soon as its chunk is done,
+so memory use depends on the chunk size rather than on the upload size.
+"""
+import json
+from itertools import groupby
+
+from django.conf import settings
+from django.db import IntegrityError
+from rest_framework import serializers
+
+from files.linkparse import normalize_location
+from files.metrics import duplicates_rejected
+from files.models import TorrentFile, MtCategory
+from files.serializers import BulkTorrentFileSerializer
+
+MAX_LINE_BYTES = 64 * 1024
+
+
+def iter_lines(stream):
+    """Yield (line number, raw bytes) for every non-blank line of ``stream``."""
+    if stream is None:
+        return
+    for number, raw in enumerate(iter(lambda: stream.readline(MAX_LINE_BYTES), b''), start=1):
+        if raw.strip():
+            yield number, raw
+
+
+class LinkImporter:
+    """
+    Import links posted by ``user``.
+
+    Each line is either a bare link or an NDJSON value: a JSON string, or an
+    object with ``location`` and an optional ``category_id`` that overrides
+    ``default_category``.
+    """
+
+    def __init__(self, user, default_category=None, chunk_size=None):
+        self.user = user
+        self.default_category = default_category
+        self.chunk_size = chunk_size or settings.LINK_IMPORT_CHUNK_SIZE
+        self.categories = {category.id: category for category in MtCategory.objects.all()}
+        self.location_field = TorrentFile._meta.get_field('location')
+
+    def parse(self, raw):
+        """Return (location, category) for a line, raising ValueError with a reason if it is unusable."""
+        try:
+            text = raw.decode('utf-8').strip()
+        except UnicodeDecodeError:
+            raise ValueError('Line is not valid UTF-8.')
+        category = self.default_category
+        if text[:1] in ('{', '"'):
+            try:
+                value = json.loads(text)
+            except ValueError:
+                raise ValueError('Line is not valid JSON.')
+            if isinstance(value, dict):
+                if 'category_id' in value and value['category_id'] is not None:
+                    category = self.categories.get(value['category_id'])
+                    if category is None:
+                        raise ValueError(f'Invalid category_id "{value["category_id"]}".')
+                value = value.get('location')
+            if not isinstance(value, str):
+                raise ValueError('Expected a link or an object with a "location".')
+            text = value.strip()
+        if not text:
+            raise ValueError('Link is empty.')
+        if len(text) > self.location_field.max_length:
+            raise ValueError(f'Link is longer than {self.location_field.max_length} characters.')
+        return text, category
+
+    def run(self, lines):
+        """Consume (number, raw) pairs and yield one result dict per line."""
+        chunk = []
+        for number, raw in lines:
+            chunk.append((number, raw))
+            if len(chunk) >= self.chunk_size:
+                yield from self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self.import_chunk(chunk)
+
+    def import_chunk(self, chunk):
+        results = {}
+        pending = []
+        for number, raw in chunk:
+            try:
+                location, category = self.parse(raw)
+            except ValueError as error:
+                results[number] = {'line': number, 'status': 'invalid', 'error': str(error)}
+            else:
+                pending.append((number, location, category))
+
+        existing = TorrentFile.find_duplicates(location for _, location, _ in pending)
+        new = []
+        seen = set()
+        for number, location, category in pending:
+            key = normalize_location(location)
+            if key in existing or key in seen:
+                duplicate = existing.get(key)
+                results[number] = {
+                    'line': number, 'location': location, 'status': 'duplicate',
+                    'existing_id': duplicate.id if duplicate else None,
+                }
+            else:
+                seen.add(key)
+                new.append((number, location, category))
+
+        locations = {number: location for number, location, _ in new}
+        for number, torrent_file in self.create(new):
+            if torrent_file is None:
+                results[number] = {
+                    'line': number, 'location': locations[number], 'status': 'duplicate', 'existing_id': None,
+                }
+            else:
+                results[number] = {
+                    'line': number, 'location': torrent_file.location, 'status': 'created', 'id': torrent_file.id,
+                }
+
+        duplicates = sum(1 for result in results.values() if result['status'] == 'duplicate')
+        if duplicates:
+            duplicates_rejected.inc(duplicates, source='import')
+        for number, _ in chunk:
+            yield results[number]
+
+    def create(self, new):
+        """Insert ``new`` grouped by category; yields (line number, TorrentFile or None if it lost a race)."""
+        serializer = BulkTorrentFileSerializer(context={'user': self.user})
+        by_category = lambda item: item[2].id if item[2] else 0
+        for _, group in groupby(sorted(new, key=by_category), key=by_category):
+            group = list(group)
+            try:
+                created = serializer.create({'links': [location for _, location, _ in group],
+                                             'category_id': group[0][2]})
+            except (serializers.ValidationError, IntegrityError):
+                # Someone posted one of these links mid-chunk; fall back to row by row
+                yield from self.create_one_by_one(group)
+            else:
+                yield from zip((number for number, _, _ in group), created)
+
+    def create_one_by_one(self, group):
+        serializer = BulkTorrentFileSerializer(context={'user': self.user})
+        for number, location, category in group:
+            try:
+                created = serializer.create({'links': [location], 'category_id': category})
+            except (serializers.ValidationError, IntegrityError):
+                yield number, None
+            else:
+                yield number, created[0]
+
+
+def stream_results(results):
+    for result in results:
+        yield json.dumps(result) + '\n'
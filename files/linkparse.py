@@ -0,0 +1,66 @@
+"""
+Parsing of posted links, shared by the upload form, the API and the importers.
+
+parse_link() makes a single pass over a link with one precompiled pattern and
+returns everything the callers need: the scheme, the Fopnu kind (chat, file
+or user), the display name and the normalized location used as the
+duplicate-detection key. parse_links() does the same for a batch, parsing
+each distinct link once.
+"""
+import re
+from collections import namedtuple
+from urllib.parse import unquote
+
+KINDS = ('chat', 'file', 'user')
+
+# Name given to a link posted without a location
+DEFAULT_NAME = 'default_value'
+
+# Everything before the first "://" is the scheme, as normalize_location() has
+# always treated it; a Fopnu kind, when present, follows the separator.
+_LINK_RE = re.compile(r'(?:(?P<scheme>.*?)://)?(?:(?P<kind>chat|file|user):)?', re.DOTALL | re.IGNORECASE)
+
+ParsedLink = namedtuple('ParsedLink', ['scheme', 'kind', 'name', 'key'])
+
+
+def parse_link(location):
+    """
+    Parse ``location`` into a ParsedLink.
+
+    ``key`` is the link stripped of surrounding whitespace, with its
+    percent-escapes decoded and its scheme lowercased. Fopnu links
+    (fopnu://file:/..., fopnu://user:..., fopnu://chat:...) are named after
+    their last decoded path segment; any other link is named after itself.
+    """
+    text = (location or '').strip()
+    decoded = unquote(text)
+    match = _LINK_RE.match(decoded)
+    scheme, kind = match.group('scheme', 'kind')
+    if scheme is None:
+        return ParsedLink(None, None, text or DEFAULT_NAME, decoded)
+
+    scheme = scheme.lower()
+    key = scheme + decoded[match.end('scheme'):]
+    if kind is not None:
+        kind = kind.lower()
+    if scheme == 'fopnu' and kind is not None:
+        name = decoded.rpartition('/')[2] or text
+    else:
+        name = text
+    return ParsedLink(scheme, kind, name, key)
+
+
+def parse_links(locations):
+    """parse_link() for each of ``locations``, in order."""
+    parsed = {}
+    results = []
+    for location in locations:
+        if location not in parsed:
+            parsed[location] = parse_link(location)
+        results.append(parsed[location])
+    return results
+
+
+def normalize_location(location):
+    """Canonical form of a link used for duplicate detection (see parse_link)."""
+    return parse_link(location).key
@@ -0,0 +1,68 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from files.models import TorrentFile
+
+
+class Command(BaseCommand):
+    help = (
+        'Link TorrentFile rows to their User by matching the uploader name. '
+        'Works in short batches, and a rerun picks up the rows that are still unlinked.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows updated per transaction (default: 1000).',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0,
+            help='Seconds to pause between batches to leave room for live traffic.',
+        )
+        parser.add_argument(
+            '--start-id', type=int, default=0,
+            help='Skip rows with an id up to and including this one, e.g. the last id a previous run reported.',
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database alias to backfill (default: "default").',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        users = get_user_model().objects.using(using)
+        pending = TorrentFile.objects.using(using).filter(uploader_user__isnull=True)
+        last_id = options['start_id']
+        linked = unmatched = 0
+
+        while True:
+            batch = list(
+                pending.filter(id__gt=last_id).order_by('id').values_list('id', 'uploader')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            ids_by_name = {}
+            for pk, uploader in batch:
+                ids_by_name.setdefault(uploader, []).append(pk)
+            user_ids = dict(users.filter(username__in=ids_by_name).values_list('username', 'id'))
+
+            with transaction.atomic(using=using):
+                for username, pks in ids_by_name.items():
+                    if username in user_ids:
+                        # uploader_user__isnull keeps rows linked concurrently by save() untouched
+                        linked += pending.filter(id__in=pks).update(uploader_user_id=user_ids[username])
+                    else:
+                        unmatched += len(pks)
+
+            self.stdout.write('Processed up to id %d (%d linked so far).' % (last_id, linked))
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            'Linked %d links to their uploader; %d have no matching user.' % (linked, unmatched)
+        ))
@@ -0,0 +1,124 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from unchainedTorrent.database import SQLITE_PRAGMAS, apply_sqlite_pragmas
+
+# SQLite's own defaults, which is what every connection ran with before configure_sqlite()
+DEFAULT_PRAGMAS = (
+    ('journal_mode', 'DELETE'),
+    ('synchronous', 'FULL'),
+)
+
+SCHEMA = (
+    'CREATE TABLE links (id INTEGER PRIMARY KEY, name TEXT NOT NULL, uploadTime REAL NOT NULL)',
+    'CREATE INDEX links_time ON links (uploadTime)',
+)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure read/write contention on a scratch SQLite file with the stock '
+        'pragmas and with the tuned ones from unchainedTorrent.database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5, help='Duration of each run (default: 5).')
+        parser.add_argument('--readers', type=int, default=4, help='Concurrent reader threads (default: 4).')
+        parser.add_argument('--rows', type=int, default=20000, help='Rows seeded before each run (default: 20000).')
+
+    def handle(self, *args, **options):
+        self.stdout.write('%-8s %10s %10s %12s %12s %8s' % (
+            'pragmas', 'reads/s', 'writes/s', 'read p50 ms', 'read p99 ms', 'errors'
+        ))
+        for label, pragmas in (('stock', DEFAULT_PRAGMAS), ('tuned', SQLITE_PRAGMAS)):
+            with tempfile.TemporaryDirectory() as directory:
+                result = self.run(os.path.join(directory, 'bench.sqlite3'), pragmas, options)
+            self.stdout.write('%-8s %10.0f %10.0f %12.2f %12.2f %8d' % ((label,) + result))
+
+    def connect(self, path, pragmas):
+        # Same 5 second busy wait Django's SQLite backend gets from the sqlite3 module
+        connection = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        apply_sqlite_pragmas(connection.cursor(), pragmas)
+        return connection
+
+    def run(self, path, pragmas, options):
+        setup = self.connect(path, pragmas)
+        for statement in SCHEMA:
+            setup.execute(statement)
+        setup.execute('BEGIN')
+        setup.executemany(
+            'INSERT INTO links (name, uploadTime) VALUES (?, ?)',
+            (('seed %d' % i, i) for i in range(options['rows'])),
+        )
+        setup.execute('COMMIT')
+        setup.close()
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        latencies, writes, errors = [], [0], [0]
+
+        def reader():
+            connection = self.connect(path, pragmas)
+            mine = []
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    connection.execute(
+                        'SELECT id, name FROM links ORDER BY uploadTime DESC LIMIT 20'
+                    ).fetchall()
+                except sqlite3.OperationalError:
+                    with lock:
+                        errors[0] += 1
+                    continue
+                mine.append(time.perf_counter() - started)
+            connection.close()
+            with lock:
+                latencies.extend(mine)
+
+        def writer():
+            connection = self.connect(path, pragmas)
+            n = options['rows']
+            while not stop.is_set():
+                n += 1
+                try:
+                    connection.execute('BEGIN IMMEDIATE')
+                    connection.execute('INSERT INTO links (name, uploadTime) VALUES (?, ?)', ('new %d' % n, n))
+                    connection.execute('COMMIT')
+                except sqlite3.OperationalError:
+                    if connection.in_transaction:
+                        connection.execute('ROLLBACK')
+                    with lock:
+                        errors[0] += 1
+                    continue
+                writes[0] += 1
+            connection.close()
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        seconds = options['seconds']
+        return (
+            len(latencies) / seconds,
+            writes[0] / seconds,
+            percentile(latencies, 0.5) * 1000,
+            percentile(latencies, 0.99) * 1000,
+            errors[0],
+        )
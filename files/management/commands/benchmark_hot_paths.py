@@ -0,0 +1,113 @@
+import json
+import os
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from files.benchmarks import compare_results, parse_size, run_benchmarks, seed_catalog
+from files.counters import total_links
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a scratch database with a synthetic catalog and measure latency, throughput and '
+        'query counts of index, search, profile, upload, /api/links/ and /api/links/bulk/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='10k', help='Links in the catalog, e.g. 10k, 1m or 10m (default: 10k).')
+        parser.add_argument('--users', type=int, default=1000, help='Uploaders in the catalog (default: 1000).')
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint (default: 200).')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests first (default: 10).')
+        parser.add_argument('--bulk-size', type=int, default=100, help='Links per bulk post (default: 100).')
+        parser.add_argument('--only', help='Comma-separated endpoints to run, e.g. index,search.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare against.')
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Keep the seeded database for the next run with the same --rows (seeding 10m takes a while).',
+        )
+
+    def handle(self, *args, **options):
+        rows = parse_size(options['rows'])
+        before = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                before = json.load(f)
+
+        setup_test_environment()
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            # A file rather than memory, so large catalogs fit and can be kept
+            test_settings['NAME'] = os.path.join(settings.BASE_DIR, 'benchmark_%d.sqlite3' % rows)
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb'], serialize=False,
+        )
+        try:
+            existing = total_links()
+            if existing and existing < rows:
+                raise CommandError(
+                    'The kept benchmark database has only %d links; run once without --keepdb to reseed it.' % existing
+                )
+            if not existing:
+                self.stdout.write('Seeding %d links...' % rows)
+                seed_catalog(rows, users=options['users'], progress=self.progress)
+            only = set(options['only'].split(',')) if options['only'] else None
+            results = run_benchmarks(options['requests'], options['warmup'], options['bulk_size'], only)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = {
+            'commit': git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'rows': rows,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'requests': options['requests'],
+            'bulk_size': options['bulk_size'],
+            'results': results,
+        }
+        self.write_table(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write('Results written to %s.' % options['output'])
+        if before is not None:
+            self.write_comparison(before, report)
+
+    def progress(self, done):
+        if done % 100000 == 0:
+            self.stdout.write('  %d links' % done)
+
+    def write_table(self, results):
+        self.stdout.write('%-10s %9s %9s %9s %9s %8s %7s' % (
+            'endpoint', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'errors'
+        ))
+        for name, result in results.items():
+            latency = result['latency_ms']
+            self.stdout.write('%-10s %9.1f %9.2f %9.2f %9.2f %8.1f %7d' % (
+                name, result['throughput_rps'], latency['p50'], latency['p95'], latency['p99'],
+                result['queries']['mean'], result['errors'],
+            ))
+
+    def write_comparison(self, before, after):
+        self.stdout.write('Compared with %s (%s links):' % (before.get('commit'), before.get('rows')))
+        for name, metric, old, new, change in compare_results(before, after):
+            self.stdout.write('%-10s %-8s %10.2f -> %10.2f %+7.1f%%' % (name, metric, old, new, change))
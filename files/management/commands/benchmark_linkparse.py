@@ -0,0 +1,86 @@
+import random
+import time
+from urllib.parse import quote, unquote
+
+from django.core.management.base import BaseCommand
+
+from files.linkparse import parse_link, parse_links
+
+FOLDERS = ('Movies', 'Music', 'TV Shows', 'Software', 'Books', 'Фильмы', 'アニメ')
+WORDS = ('The', 'Night', 'Live', 'Remastered', 'Season 01', 'Extended Cut', 'Soundtrack', 'Été', 'Vol. 2')
+EXTENSIONS = ('.mkv', '.mp4', '.flac', '.mp3', '.zip', '.pdf', '.iso')
+
+
+def legacy_parse(location):
+    """What the upload view and both serializers did before files.linkparse."""
+    name = location or 'default_value'
+    if location and 'fopnu' in location:
+        if any(word in location for word in ('chat:', 'file:', 'user:')):
+            name = unquote(location).split('/')[-1]
+    key = unquote((location or '').strip())
+    scheme, sep, rest = key.partition('://')
+    if sep:
+        key = scheme.lower() + sep + rest
+    return name, key
+
+
+def make_corpus(count, seed):
+    """Links shaped like the ones users post: mostly Fopnu files, often percent-encoded, some repeats."""
+    rng = random.Random(seed)
+    links = []
+    for _ in range(count):
+        roll = rng.random()
+        if links and roll < 0.1:
+            links.append(rng.choice(links))
+            continue
+        if roll < 0.75:
+            path = '/'.join(rng.choice(FOLDERS) for _ in range(rng.randint(1, 4)))
+            filename = ' '.join(rng.sample(WORDS, rng.randint(1, 4))) + rng.choice(EXTENSIONS)
+            location = 'fopnu://file:/%s/%s' % (path, filename)
+            if rng.random() < 0.6:
+                location = 'fopnu://file:' + quote(location[len('fopnu://file:'):])
+        elif roll < 0.85:
+            location = 'fopnu://user:%s' % rng.choice(WORDS).replace(' ', '')
+        elif roll < 0.9:
+            location = 'fopnu://chat:/%s' % quote(rng.choice(WORDS))
+        else:
+            location = 'https://example.com/%s' % quote(rng.choice(WORDS))
+        if rng.random() < 0.05:
+            location = location.replace('fopnu://', 'FOPNU://') + ' '
+        links.append(location)
+    return links
+
+
+def best_of(repeat, function, links):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(links)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = 'Time link name extraction and normalization: the old substring scans against files.linkparse.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--links', type=int, default=50000, help='Links in the corpus (default: 50000).')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per parser; the best is kept (default: 5).')
+        parser.add_argument('--seed', type=int, default=1, help='Seed for the generated corpus (default: 1).')
+
+    def handle(self, *args, **options):
+        links = make_corpus(options['links'], options['seed'])
+
+        mismatched = sum(legacy_parse(link)[1] != parse_link(link).key for link in links)
+        if mismatched:
+            self.stderr.write('%d links normalize differently than before.' % mismatched)
+
+        runs = (
+            ('legacy', lambda batch: [legacy_parse(link) for link in batch]),
+            ('parse_link', lambda batch: [parse_link(link) for link in batch]),
+            ('parse_links', parse_links),
+        )
+        self.stdout.write('%-12s %12s %10s' % ('parser', 'links/s', 'us/link'))
+        for label, function in runs:
+            seconds = best_of(options['repeat'], function, links)
+            self.stdout.write('%-12s %12.0f %10.2f' % (label, len(links) / seconds, seconds * 1e6 / len(links)))
@@ -0,0 +1,49 @@
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from files.submissions import process_batch, reclaim_stale
+
+
+class Command(BaseCommand):
+    help = 'Import the links queued by API posts made with ?async=1, a batch of jobs per transaction.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.LINK_SUBMISSION_BATCH_SIZE,
+            help='Jobs imported per transaction (default: LINK_SUBMISSION_BATCH_SIZE).',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when the queue is empty instead of waiting for more jobs.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait before looking again when the queue is empty (default: 1).',
+        )
+        parser.add_argument(
+            '--reclaim-after', type=int, default=300,
+            help='Requeue jobs another worker has held for this many seconds (default: 300).',
+        )
+
+    def handle(self, *args, **options):
+        worker = '%s:%d:%d' % (socket.gethostname(), os.getpid(), int(time.time()))
+        processed = 0
+        while True:
+            reclaimed = reclaim_stale(options['reclaim_after'])
+            if reclaimed:
+                self.stdout.write('Requeued %d stalled jobs.' % reclaimed)
+            submissions = process_batch(worker, options['batch_size'])
+            processed += len(submissions)
+            if submissions:
+                self.stdout.write('Processed %d jobs (%d links).' % (
+                    len(submissions), sum(len(submission.links) for submission in submissions)
+                ))
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS('Queue empty; processed %d jobs.' % processed))
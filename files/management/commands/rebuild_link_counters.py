@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from files.counters import rebuild_counters
+from files.models import CategoryLinkCount, DailyLinkCount, UploaderLinkCount
+
+
+class Command(BaseCommand):
+    help = 'Recount the per-category, per-uploader and per-day link counters from TorrentFile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database alias to rebuild the counters on (default: "default").',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        rebuild_counters(using)
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt link counters on "%s": %d categories, %d uploaders, %d days.' % (
+                using,
+                CategoryLinkCount.objects.using(using).count(),
+                UploaderLinkCount.objects.using(using).count(),
+                DailyLinkCount.objects.using(using).count(),
+            )
+        ))
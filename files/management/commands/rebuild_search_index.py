@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from files.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Recreate the full-text search index for TorrentFile names from the table contents.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database alias to rebuild the index on (default: "default").',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        backend = get_search_backend(using)
+        backend.install(using)
+        backend.rebuild(using)
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt search index with %s on "%s".' % (type(backend).__name__, using)
+        ))
@@ -0,0 +1,22 @@
+"""Link, search and cache metrics for /metrics (see unchainedTorrent.metrics)."""
+from unchainedTorrent.metrics import Counter, Histogram
+
+links_created = Counter(
+    'nulinks_links_created_total', 'Links stored, by single save or bulk insert.', ['source'],
+)
+duplicates_rejected = Counter(
+    'nulinks_duplicates_rejected_total', 'Posted links turned away because they were already stored.', ['source'],
+)
+searches = Counter(
+    'nulinks_searches_total', 'Searches run against the database, with or without search terms.', ['terms'],
+)
+search_results = Histogram(
+    'nulinks_search_results', 'Links on a page of search results.', buckets=(0, 1, 5, 10, 20),
+)
+cache_requests = Counter(
+    'nulinks_cache_requests_total', 'Cache lookups by cache and outcome.', ['cache', 'result'],
+)
+
+
+def record_cache(cache, hit):
+    cache_requests.inc(cache=cache, result='hit' if hit else 'miss')
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import files.models
+
+
+def install_search_index(apps, schema_editor):
+    from files.search import VENDOR_BACKENDS
+
+    backend = VENDOR_BACKENDS.get(schema_editor.connection.vendor)
+    if backend is not None:
+        backend().install(schema_editor.connection.alias)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute('DROP TRIGGER IF EXISTS files_torrentfile_fts_%s' % suffix)
+        schema_editor.execute('DROP TABLE IF EXISTS files_torrentfile_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS files_torrentfile_name_tsv')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0003_auto_20250711_0319'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TorrentFileSearchEntry',
+            fields=[
+                ('torrent_file', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='files.torrentfile')),
+                ('name', files.models.FullTextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'files_torrentfile_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(install_search_index, drop_search_index),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+
+from files.models import normalize_location
+
+BATCH_SIZE = 1000
+
+
+def fill_location_keys(apps, schema_editor):
+    """
+    Key every row by its normalized location. When older rows already share
+    a key, only the first one posted gets it; the rest keep NULL.
+    """
+    TorrentFile = apps.get_model('files', 'TorrentFile')
+    db = schema_editor.connection.alias
+    seen = set()
+    last_id = 0
+    while True:
+        batch = list(
+            TorrentFile.objects.using(db).filter(id__gt=last_id).order_by('id').only('id', 'location')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for torrent_file in batch:
+            key = normalize_location(torrent_file.location)
+            if key not in seen:
+                seen.add(key)
+                torrent_file.location_key = key
+        TorrentFile.objects.using(db).bulk_update(
+            [f for f in batch if f.location_key is not None], ['location_key']
+        )
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0004_torrentfilesearchentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='torrentfile',
+            name='location_key',
+            field=models.CharField(editable=False, max_length=255, null=True, unique=True),
+        ),
+        migrations.RunPython(fill_location_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0005_torrentfile_location_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='torrentfile',
+            index=models.Index(fields=['uploader', '-uploadTime', '-id'], name='files_uploader_time_idx'),
+        ),
+    ]
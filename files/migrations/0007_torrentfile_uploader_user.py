@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    """
+    Adds the nullable uploader_user column only. Existing rows are linked by
+    the resumable ``backfill_uploader_user`` command, so the migration itself
+    never holds a long lock on a populated table.
+    """
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('files', '0006_torrentfile_uploader_time_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='torrentfile',
+            name='uploader_user',
+            field=models.ForeignKey(
+                blank=True, null=True, db_index=False, on_delete=django.db.models.deletion.SET_NULL,
+                related_name='torrent_files', to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='torrentfile',
+            index=models.Index(fields=['uploader_user', '-uploadTime', '-id'], name='files_uploader_user_time_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    from files.counters import rebuild_counters
+    rebuild_counters(using=schema_editor.connection.alias, models=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0007_torrentfile_uploader_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyLinkCount',
+            fields=[
+                ('count', models.PositiveIntegerField(default=0)),
+                ('day', models.DateField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='UploaderLinkCount',
+            fields=[
+                ('count', models.PositiveIntegerField(default=0)),
+                ('uploader', models.CharField(max_length=25, primary_key=True, serialize=False)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='CategoryLinkCount',
+            fields=[
+                ('count', models.PositiveIntegerField(default=0)),
+                ('category', models.OneToOneField(
+                    on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='link_count',
+                    serialize=False, to='files.mtcategory',
+                )),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
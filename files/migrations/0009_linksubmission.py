@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('files', '0008_link_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('links', models.JSONField()),
+                ('status', models.CharField(
+                    choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')],
+                    default='pending', max_length=10,
+                )),
+                ('claimed_by', models.CharField(blank=True, max_length=64)),
+                ('results', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('category', models.ForeignKey(
+                    blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='files.mtcategory',
+                )),
+                ('user', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, related_name='link_submissions',
+                    to=settings.AUTH_USER_MODEL,
+                )),
+            ],
+            options={
+                'managed': True,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='linksubmission',
+            index=models.Index(fields=['status', 'id'], name='files_submission_status_idx'),
+        ),
+    ]
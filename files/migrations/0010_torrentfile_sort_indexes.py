@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0009_linksubmission'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='torrentfile',
+            index=models.Index(fields=['name', 'id'], name='files_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='torrentfile',
+            index=models.Index(fields=['category', '-uploadTime', '-id'], name='files_category_time_idx'),
+        ),
+    ]
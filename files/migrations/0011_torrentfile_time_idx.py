@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0010_torrentfile_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='torrentfile',
+            index=models.Index(fields=['-uploadTime', '-id'], name='files_time_idx'),
+        ),
+    ]
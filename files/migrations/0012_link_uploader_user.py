@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def link_uploader_users(apps, schema_editor):
+    """
+    Link the rows backfill_uploader_user has not reached yet, so listings can
+    filter on uploader_user alone. Rows whose uploader has no account stay NULL.
+    """
+    TorrentFile = apps.get_model('files', 'TorrentFile')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    db = schema_editor.connection.alias
+    pending = TorrentFile.objects.using(db).filter(uploader_user__isnull=True)
+    last_id = 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id).order_by('id').values_list('id', 'uploader')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        ids_by_name = {}
+        for pk, uploader in batch:
+            ids_by_name.setdefault(uploader, []).append(pk)
+        user_ids = User.objects.using(db).filter(username__in=ids_by_name).values_list('username', 'id')
+        for username, user_id in user_ids:
+            pending.filter(id__in=ids_by_name[username]).update(uploader_user_id=user_id)
+
+
+class Migration(migrations.Migration):
+    """
+    Runs outside a transaction so each batch commits on its own. On a large
+    table, run backfill_uploader_user before migrating and this finds nothing
+    left to do.
+    """
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('files', '0011_torrentfile_time_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_uploader_users, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.db import models
 
+from files.linkparse import normalize_location  # noqa: F401 (imported from here by migrations)
+
 
 class TimestampFields(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -10,19 +14,61 @@ class TimestampFields(models.Model):
         abstract = True
 
 
+class TorrentFileQuerySet(models.QuerySet):
+    def listing(self):
+        """Rows as shown in link listings, with their category loaded in the same query."""
+        return self.select_related('category')
+
+    def owned_by(self, user):
+        """Links posted by ``user``, newest first from files_uploader_user_time_idx when ordered that way."""
+        return self.filter(uploader_user=user)
+
+
 class TorrentFile(TimestampFields):
     name = models.CharField(max_length=255)
     uploader = models.CharField(max_length=25)
+    # Owner of the link; NULL for legacy rows whose uploader has no account (see migration 0012).
+    # files_uploader_user_time_idx leads with it, so it needs no index of its own.
+    uploader_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, models.SET_NULL, blank=True, null=True, db_index=False,
+        related_name='torrent_files',
+    )
     location = models.CharField(max_length=255)
+    # normalize_location(location); NULL only for legacy duplicates that predate the constraint
+    location_key = models.CharField(max_length=255, unique=True, null=True, editable=False)
     uploadTime = models.DateTimeField(auto_now=False, auto_now_add=True)
     category = models.ForeignKey('MtCategory', models.DO_NOTHING, blank=True, null=True)
 
+    objects = TorrentFileQuerySet.as_manager()
+
     class Meta:
         managed = True
+        indexes = [
+            # Profile and API listings: one uploader's links, newest first
+            models.Index(fields=['uploader_user', '-uploadTime', '-id'], name='files_uploader_user_time_idx'),
+            # ?sort=uploader
+            models.Index(fields=['uploader', '-uploadTime', '-id'], name='files_uploader_time_idx'),
+            # Keyset pages of every link, newest first (files.pagination.DEFAULT_ORDERING)
+            models.Index(fields=['-uploadTime', '-id'], name='files_time_idx'),
+            # One per other ?sort= order (files.sorting), read forwards or backwards
+            models.Index(fields=['name', 'id'], name='files_name_idx'),
+            models.Index(fields=['category', '-uploadTime', '-id'], name='files_category_time_idx'),
+        ]
 
     def __str__(self):
         return self.name.title()
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or self.location_key is not None:
+            self.location_key = normalize_location(self.location)
+        if self._state.adding and self.uploader_user_id is None and self.uploader:
+            self.uploader_user = get_user_model().objects.filter(username=self.uploader).first()
+        super().save(*args, **kwargs)
     
+    def is_owned_by(self, user):
+        """Whether ``user`` posted this link; see TorrentFileQuerySet.owned_by."""
+        return self.uploader_user_id is not None and self.uploader_user_id == user.pk
+
     @classmethod
     def find_duplicate(cls, location):
         """
@@ -30,10 +76,19 @@ class TorrentFile(TimestampFields):
         Returns the existing TorrentFile if found, None otherwise.
         """
         try:
-            return cls.objects.get(location=location)
+            return cls.objects.get(location_key=normalize_location(location))
         except cls.DoesNotExist:
             return None
 
+    @classmethod
+    def find_duplicates(cls, locations):
+        """
+        Set-based find_duplicate() for many links in one query.
+        Returns a dict mapping each normalized location that already exists to its TorrentFile.
+        """
+        keys = {normalize_location(location) for location in locations}
+        return {f.location_key: f for f in cls.objects.filter(location_key__in=keys)}
+
 
 class MtCategory(TimestampFields):
     name = models.CharField(max_length=100)
@@ -44,3 +99,94 @@ class MtCategory(TimestampFields):
 
     def __str__(self):
         return self.name.title()
+
+
+class LinkSubmission(TimestampFields):
+    """
+    Links posted to the API with ?async=1, queued for the
+    process_link_submissions worker. ``results`` holds one entry per link
+    once the worker is done, in the same format as /api/links/import/.
+    """
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, models.CASCADE, related_name='link_submissions')
+    category = models.ForeignKey('MtCategory', models.SET_NULL, blank=True, null=True)
+    links = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # Identifies the worker run that took the job
+    claimed_by = models.CharField(max_length=64, blank=True)
+    results = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        managed = True
+        indexes = [
+            models.Index(fields=['status', 'id'], name='files_submission_status_idx'),
+        ]
+
+    def __str__(self):
+        return 'Submission %s (%s)' % (self.pk, self.status)
+
+
+class LinkCounter(models.Model):
+    """
+    Denormalized number of links for one key, kept current by files.counters
+    so listings can show totals without a GROUP BY over TorrentFile.
+    """
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class CategoryLinkCount(LinkCounter):
+    category = models.OneToOneField(MtCategory, models.CASCADE, primary_key=True, related_name='link_count')
+
+
+class UploaderLinkCount(LinkCounter):
+    uploader = models.CharField(max_length=25, primary_key=True)
+
+
+class DailyLinkCount(LinkCounter):
+    day = models.DateField(primary_key=True)
+
+
+class FullTextField(models.TextField):
+    """Column of a full-text virtual table, queryable with the ``match`` lookup."""
+
+
+@FullTextField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return '%s MATCH %s' % (lhs, rhs), lhs_params + rhs_params
+
+
+class TorrentFileSearchEntry(models.Model):
+    """
+    Read-only view of the SQLite FTS5 index over TorrentFile names.
+
+    The virtual table is created by migration and kept in sync by triggers,
+    see files.search.SQLiteFTSBackend.
+    """
+    torrent_file = models.OneToOneField(
+        TorrentFile, models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_entry'
+    )
+    name = FullTextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'files_torrentfile_fts'
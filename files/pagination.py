@@ -0,0 +1,308 @@
+"""
+Pagination for TorrentFile listings.
+
+Keyset pages are addressed by an opaque cursor holding the sort key of the
+row at the page boundary, so fetching any page is an index range scan of
+``per_page + 1`` rows no matter how deep it is: no COUNT(*) and no OFFSET.
+CountingPaginator keeps numbered pages for shallow browsing without an
+exact count of the whole table.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import DateTimeField, Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+DEFAULT_ORDERING = ('-uploadTime', '-id')
+# Most rows counted for a filtered listing; past it the count shows as "10000+"
+COUNT_CAP = 10000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def estimate_count(queryset):
+    """
+    Cheap row count for ``queryset``: the planner's estimate on PostgreSQL,
+    an exact COUNT(*) elsewhere.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    return queryset.count()
+
+
+def capped_count(queryset, cap=COUNT_CAP):
+    """(count, is_capped): rows in ``queryset``, counting no further than ``cap``."""
+    # COUNT(*) over a LIMITed subquery stops scanning after cap + 1 rows
+    count = queryset.order_by()[:cap + 1].count()
+    if count > cap:
+        return cap, True
+    return count, False
+
+
+class CountingPaginator(Paginator):
+    """
+    Numbered pages without an exact COUNT(*) over the listing.
+
+    For an unfiltered listing pass ``total``, a callable returning a
+    maintained row count such as files.counters.total_links. Otherwise rows
+    are counted only up to ``cap``; past that ``count`` stays at ``cap`` and
+    ``is_capped`` is set, so templates can show "10000+".
+    """
+
+    def __init__(self, object_list, per_page, total=None, cap=COUNT_CAP, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.total = total
+        self.cap = cap
+        self.is_capped = False
+
+    @cached_property
+    def count(self):
+        if self.total is not None:
+            return self.total()
+        count, self.is_capped = capped_count(self.object_list, self.cap)
+        return count
+
+
+class KeysetPage:
+    """A page of results with the same iteration interface as django.core.paginator.Page."""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<KeysetPage of %d items>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` on ``ordering``, which must end in a unique field
+    so every row has a distinct position.
+
+    ``ordering`` entries are field names or annotations, prefixed with ``-``
+    for descending order, e.g. ``('-uploadTime', '-id')``.
+    """
+
+    def __init__(self, queryset, per_page, ordering=DEFAULT_ORDERING):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    @property
+    def estimated_count(self):
+        """Approximate total number of rows; only computed when asked for."""
+        if not hasattr(self, '_estimated_count'):
+            self._estimated_count = estimate_count(self.queryset)
+        return self._estimated_count
+
+    def encode_cursor(self, obj, direction='next'):
+        values = [self._dump_value(getattr(obj, field)) for field in self.fields]
+        payload = json.dumps({'d': direction, 'v': values}, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            direction, values = payload['d'], payload['v']
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+            raise InvalidCursor(cursor)
+        if direction not in ('next', 'prev') or not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor(cursor)
+        return direction, [self._parse_value(field, value) for field, value in zip(self.fields, values)]
+
+    @staticmethod
+    def _dump_value(value):
+        # DjangoJSONEncoder drops microseconds, which would skip rows on the boundary.
+        if isinstance(value, datetime.datetime):
+            return value.isoformat()
+        return value
+
+    def _parse_value(self, field, value):
+        """Convert a cursor value back to the type of ``field``; anything else is an InvalidCursor."""
+        model_field = self._model_field(field)
+        if model_field is None:
+            # An annotation such as search_rank
+            if value is not None and not isinstance(value, (int, float, str)):
+                raise InvalidCursor(value)
+            return value
+        if value is None:
+            if not model_field.null:
+                raise InvalidCursor(value)
+            return None
+        try:
+            parsed = model_field.to_python(value)
+        except (ValidationError, TypeError, ValueError):
+            raise InvalidCursor(value)
+        if isinstance(model_field, DateTimeField) and timezone.is_naive(parsed) != (not settings.USE_TZ):
+            raise InvalidCursor(value)
+        return parsed
+
+    def _model_field(self, path):
+        model = self.queryset.model
+        field = None
+        for part in path.split('__'):
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                return None
+            model = field.related_model or model
+        return field
+
+    def _seek(self, values, ordering):
+        """
+        Q object selecting rows strictly after ``values`` in ``ordering``.
+
+        NULLs sort where the database puts them by default, first or last,
+        and never match ``<`` or ``>``, so nullable fields compare with
+        IS NULL / IS NOT NULL on that side.
+        """
+        nulls_largest = connections[self.queryset.db].features.nulls_order_largest
+        condition = Q()
+        equal = Q()
+        for name, value in zip(ordering, values):
+            field = name.lstrip('-')
+            descending = name.startswith('-')
+            if value is None:
+                # Non-NULLs come after NULLs when NULLs sort first in this direction
+                if nulls_largest == descending:
+                    condition |= equal & Q(**{'%s__isnull' % field: False})
+                equal &= Q(**{'%s__isnull' % field: True})
+                continue
+            after = Q(**{'%s__%s' % (field, 'lt' if descending else 'gt'): value})
+            model_field = self._model_field(field)
+            if model_field is not None and model_field.null and nulls_largest != descending:
+                after |= Q(**{'%s__isnull' % field: True})
+            condition |= equal & after
+            equal &= Q(**{field: value})
+        return condition
+
+    @staticmethod
+    def _reverse(ordering):
+        return tuple(name[1:] if name.startswith('-') else '-' + name for name in ordering)
+
+    def get_page(self, cursor=None):
+        """Return the page ``cursor`` points at; invalid cursors give the first page."""
+        direction, values = 'next', None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction, values = 'next', None
+
+        ordering = self.ordering if direction == 'next' else self._reverse(self.ordering)
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, ordering))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == 'prev':
+            rows.reverse()
+            has_next, has_previous = values is not None, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        next_cursor = self.encode_cursor(rows[-1], 'next') if rows and has_next else None
+        previous_cursor = self.encode_cursor(rows[0], 'prev') if rows and has_previous else None
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF pagination on top of KeysetPaginator.
+
+    ``page_size`` picks the page length and ``count=1`` adds an estimated
+    total to the response.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 1000
+    ordering = DEFAULT_ORDERING
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, view):
+        """The view's ordering when it picks one per request (e.g. from ?sort=), otherwise ``ordering``."""
+        if view is not None and hasattr(view, 'get_ordering'):
+            return view.get_ordering()
+        return self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.paginator = KeysetPaginator(queryset, self.get_page_size(request), self.get_ordering(view))
+        self.page = self.paginator.get_page(request.query_params.get(self.cursor_query_param))
+        return list(self.page)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_link(self.page.next_cursor),
+            'previous': self.get_link(self.page.previous_cursor),
+            'results': data,
+        }
+        if self.request.query_params.get('count') in ('1', 'true'):
+            payload['estimated_count'] = self.paginator.estimated_count
+        return Response(payload)
+
+
+def query_string_without(request, *names):
+    """The current query string minus ``names``, ready to have another parameter appended."""
+    params = request.GET.copy()
+    for name in names:
+        params.pop(name, None)
+    encoded = params.urlencode()
+    return encoded + '&' if encoded else ''
@@ -0,0 +1,154 @@
+"""
+Full-text search over TorrentFile names.
+
+The backend is chosen from settings.SEARCH_BACKEND (a dotted path) or, when
+that is unset, from the vendor of the database connection:
+
+- SQLite: an FTS5 external-content table kept in sync by triggers.
+- PostgreSQL: a GIN expression index over to_tsvector('simple', name).
+- Anything else: the plain ``name__icontains`` scan.
+
+Every backend returns the filtered queryset annotated with ``search_rank``
+(higher is better), so callers can order and paginate on it.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import BooleanField, F, FloatField
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from files.models import TorrentFile
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    """Split a user query into the word tokens every backend searches for."""
+    return TOKEN_RE.findall(query.lower())
+
+
+class SimpleSearchBackend:
+    """Substring search without an index, used when nothing better is available."""
+
+    def search(self, queryset, query):
+        return queryset.filter(name__icontains=query).annotate(search_rank=RawSQL('0', (), output_field=FloatField()))
+
+    def install(self, using):
+        return False
+
+    def rebuild(self, using):
+        pass
+
+
+class SQLiteFTSBackend(SimpleSearchBackend):
+    """
+    FTS5 index stored in files_torrentfile_fts.
+
+    Django rebuilds files_torrentfile from scratch for most ALTER TABLE
+    operations on SQLite, which drops the sync triggers with it, so
+    install() is run again after every migrate.
+    """
+    STATEMENTS = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS files_torrentfile_fts USING fts5("
+        "name, content='files_torrentfile', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS files_torrentfile_fts_ai AFTER INSERT ON files_torrentfile BEGIN "
+        "INSERT INTO files_torrentfile_fts(rowid, name) VALUES (new.id, new.name); END",
+        "CREATE TRIGGER IF NOT EXISTS files_torrentfile_fts_ad AFTER DELETE ON files_torrentfile BEGIN "
+        "INSERT INTO files_torrentfile_fts(files_torrentfile_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+        "CREATE TRIGGER IF NOT EXISTS files_torrentfile_fts_au AFTER UPDATE OF name ON files_torrentfile BEGIN "
+        "INSERT INTO files_torrentfile_fts(files_torrentfile_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+        "INSERT INTO files_torrentfile_fts(rowid, name) VALUES (new.id, new.name); END",
+    ]
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return super().search(queryset, query)
+        # Every token must match, each as a prefix so partial words still hit.
+        expression = ' '.join('"%s"*' % token for token in tokens)
+        return queryset.filter(search_entry__name__match=expression).annotate(
+            search_rank=-F('search_entry__rank')
+        )
+
+    def install(self, using):
+        """Create the index and its triggers if missing. Returns True if anything was created."""
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE name LIKE 'files_torrentfile_fts%'"
+                " AND type IN ('table', 'trigger')"
+            )
+            before = cursor.fetchone()[0]
+            for statement in self.STATEMENTS:
+                cursor.execute(statement)
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE name LIKE 'files_torrentfile_fts%'"
+                " AND type IN ('table', 'trigger')"
+            )
+            created = cursor.fetchone()[0] != before
+        if created:
+            # Rows may have changed while the triggers were missing.
+            self.rebuild(using)
+        return created
+
+    def rebuild(self, using):
+        with connections[using].cursor() as cursor:
+            cursor.execute("INSERT INTO files_torrentfile_fts(files_torrentfile_fts) VALUES ('rebuild')")
+
+
+class PostgresSearchBackend(SimpleSearchBackend):
+    """tsvector search matching the files_torrentfile_name_tsv GIN expression index."""
+    # Must stay textually identical to the indexed expression for the planner to use it.
+    VECTOR = "to_tsvector('simple', \"files_torrentfile\".\"name\")"
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return super().search(queryset, query)
+        tsquery = ' & '.join('%s:*' % token for token in tokens)
+        return queryset.filter(
+            RawSQL("%s @@ to_tsquery('simple', %%s)" % self.VECTOR, (tsquery,), output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL("ts_rank(%s, to_tsquery('simple', %%s))" % self.VECTOR, (tsquery,), output_field=FloatField())
+        )
+
+    def install(self, using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS files_torrentfile_name_tsv ON files_torrentfile "
+                "USING gin (to_tsvector('simple', name))"
+            )
+        return False
+
+    def rebuild(self, using):
+        with connections[using].cursor() as cursor:
+            cursor.execute('REINDEX INDEX files_torrentfile_name_tsv')
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(using=None):
+    """Return the search backend for the database TorrentFile is read from."""
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    using = using or router.db_for_read(TorrentFile)
+    return VENDOR_BACKENDS.get(connections[using].vendor, SimpleSearchBackend)()
+
+
+def search_torrent_files(queryset, query):
+    """Filter ``queryset`` down to files matching ``query``, annotated with ``search_rank``."""
+    return get_search_backend(queryset.db).search(queryset, query)
+
+
+def ensure_search_index(sender, using, **kwargs):
+    """post_migrate hook: put back anything a table rebuild dropped."""
+    backend = VENDOR_BACKENDS.get(connections[using].vendor)
+    if backend is not None:
+        backend().install(using)
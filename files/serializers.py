@@ -1,6 +1,12 @@
+from django.conf import settings
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import TorrentFile, MtCategory
+from django.db import IntegrityError, transaction
+from .categories import category_registry
+from .linkparse import parse_link, parse_links
+from .metrics import duplicates_rejected
+from .models import TorrentFile, MtCategory, LinkSubmission
+from .signals import links_bulk_created
 
 
 class MtCategorySerializer(serializers.ModelSerializer):
@@ -26,10 +32,19 @@ class TorrentFileSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'location', 'uploader', 'uploadTime', 'category', 'category_id']
         read_only_fields = ['id', 'uploader', 'uploadTime']
 
+    def __init__(self, *args, **kwargs):
+        # Optional subset of field names to serialize, e.g. from ?fields=id,location
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     def validate_location(self, value):
         """Check for duplicate links"""
         existing_file = TorrentFile.find_duplicate(value)
         if existing_file:
+            duplicates_rejected.inc(source='api')
             raise serializers.ValidationError(
                 f'This link has already been posted by {existing_file.uploader} '
                 f'on {existing_file.uploadTime.strftime("%Y-%m-%d %H:%M")} '
@@ -41,30 +56,28 @@ class TorrentFileSerializer(serializers.ModelSerializer):
         # Extract name from location if not provided
         location = validated_data.get('location', '')
         if 'name' not in validated_data or not validated_data['name']:
-            validated_data['name'] = self._extract_name_from_link(location)
+            validated_data['name'] = parse_link(location).name
         
         # Set the uploader to the current user
         validated_data['uploader'] = self.context['request'].user.username
-        return super().create(validated_data)
-
-    def _extract_name_from_link(self, url_location):
-        """Extract name from Fopnu link, similar to existing logic"""
-        from urllib.parse import unquote
-        
-        if url_location and "fopnu" in url_location:
-            words = ["chat:", "file:", "user:"]
-            if any(word in url_location for word in words):
-                url_location_parsed = unquote(url_location)
-                return url_location_parsed.split("/")[-1]
-        
-        return url_location or "default_value"
+        validated_data['uploader_user'] = self.context['request'].user
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            # Lost a race with a concurrent post of the same link
+            try:
+                self.validate_location(location)
+            except serializers.ValidationError as error:
+                raise serializers.ValidationError({'location': error.detail})
+            raise
 
 
 class BulkTorrentFileSerializer(serializers.Serializer):
     links = serializers.ListField(
         child=serializers.CharField(max_length=255),
         min_length=1,
-        max_length=100  # Limit bulk operations
+        max_length=settings.BULK_LINKS_MAX_BATCH  # Larger uploads go through /api/links/import/
     )
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=MtCategory.objects.all(),
@@ -73,25 +86,24 @@ class BulkTorrentFileSerializer(serializers.Serializer):
     )
 
     def validate_links(self, value):
-        """Check for duplicate links in the batch"""
-        duplicates = []
-        for link in value:
-            existing_file = TorrentFile.find_duplicate(link)
+        """Check for links that already exist or repeat within the batch"""
+        existing = TorrentFile.find_duplicates(value)
+        error_messages = []
+        seen = set()
+        for link, parsed in zip(value, parse_links(value)):
+            key = parsed.key
+            existing_file = existing.get(key)
             if existing_file:
-                duplicates.append({
-                    'link': link,
-                    'uploader': existing_file.uploader,
-                    'upload_time': existing_file.uploadTime.strftime("%Y-%m-%d %H:%M"),
-                    'name': existing_file.name
-                })
-        
-        if duplicates:
-            error_messages = []
-            for dup in duplicates:
                 error_messages.append(
-                    f'Link "{dup["link"]}" has already been posted by {dup["uploader"]} '
-                    f'on {dup["upload_time"]} with the name "{dup["name"]}".'
+                    f'Link "{link}" has already been posted by {existing_file.uploader} '
+                    f'on {existing_file.uploadTime.strftime("%Y-%m-%d %H:%M")} with the name "{existing_file.name}".'
                 )
+            elif key in seen:
+                error_messages.append(f'Link "{link}" appears more than once in this batch.')
+            seen.add(key)
+
+        if error_messages:
+            duplicates_rejected.inc(len(error_messages), source='bulk')
             raise serializers.ValidationError(error_messages)
         
         return value
@@ -99,31 +111,94 @@ class BulkTorrentFileSerializer(serializers.Serializer):
     def create(self, validated_data):
         links = validated_data['links']
         category = validated_data.get('category_id')
-        user = self.context['request'].user
-        
-        created_files = []
-        for link in links:
-            # Parse the name from the link similar to the existing logic
-            name = self._extract_name_from_link(link)
-            
-            torrent_file = TorrentFile.objects.create(
-                name=name,
+        # Importers and the submission worker pass the user without a request
+        user = self.context['user'] if 'user' in self.context else self.context['request'].user
+
+        # bulk_create() skips save(), so the location key is filled in here
+        new_files = [
+            TorrentFile(
+                name=parsed.name,
                 location=link,
+                location_key=parsed.key,
                 uploader=user.username,
+                uploader_user=user,
                 category=category
             )
-            created_files.append(torrent_file)
-        
-        return created_files
+            for link, parsed in zip(links, parse_links(links))
+        ]
+        try:
+            with transaction.atomic():
+                TorrentFile.objects.bulk_create(new_files)
+        except IntegrityError:
+            # A concurrent post took one of the links after validation
+            try:
+                self.validate_links(links)
+            except serializers.ValidationError as error:
+                raise serializers.ValidationError({'links': error.detail})
+            raise
+
+        if any(f.pk is None for f in new_files):
+            # The backend cannot return ids from a bulk insert; fetch the rows back in one query
+            by_key = TorrentFile.objects.listing().in_bulk(
+                [f.location_key for f in new_files], field_name='location_key'
+            )
+            new_files = [by_key[f.location_key] for f in new_files]
+        links_bulk_created.send(sender=TorrentFile, files=new_files)
+        return new_files
+
+
+class QueuedLinksSerializer(serializers.Serializer):
+    """
+    Shape check for links posted with ?async=1. Duplicates are only looked
+    for by the worker, so queueing never waits on the write lock.
+    """
+    category_id = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate_category_id(self, value):
+        if value is not None and category_registry.get(value) is None:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
+    def get_links(self, validated_data):
+        raise NotImplementedError('.get_links() must be overridden')
+
+    def create(self, validated_data):
+        return LinkSubmission.objects.create(
+            user=self.context['request'].user,
+            category_id=validated_data.get('category_id'),
+            links=self.get_links(validated_data),
+        )
+
+
+class QueuedLinkSerializer(QueuedLinksSerializer):
+    location = serializers.CharField(max_length=255)
+
+    def get_links(self, validated_data):
+        return [validated_data['location']]
+
+
+class QueuedBulkLinksSerializer(QueuedLinksSerializer):
+    links = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        min_length=1,
+        max_length=settings.BULK_LINKS_MAX_BATCH
+    )
+
+    def get_links(self, validated_data):
+        return validated_data['links']
+
+
+class LinkSubmissionSerializer(serializers.ModelSerializer):
+    summary = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LinkSubmission
+        fields = ['id', 'status', 'created_at', 'modified_at', 'summary', 'results', 'error']
+
+    def get_summary(self, submission):
+        """Number of links per result status, once processed."""
+        summary = {}
+        for result in submission.results or []:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        return summary
 
-    def _extract_name_from_link(self, url_location):
-        """Extract name from Fopnu link, similar to existing logic"""
-        from urllib.parse import unquote
-        
-        if url_location and "fopnu" in url_location:
-            words = ["chat:", "file:", "user:"]
-            if any(word in url_location for word in words):
-                url_location_parsed = unquote(url_location)
-                return url_location_parsed.split("/")[-1]
-        
-        return url_location or "default_value"
\ No newline at end of file
@@ -0,0 +1,127 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+from rest_framework.authtoken.models import Token
+
+from files import counters, metrics
+from files.authentication import token_cache
+from files.cache import bump_listing_version
+from files.categories import category_registry
+from files.models import TorrentFile, MtCategory
+from files.suggest import suggest_index
+
+# Sent with the list of new TorrentFile rows after a bulk_create(), which
+# does not send post_save. Receivers: ``sender`` is TorrentFile, ``files``
+# the created rows.
+links_bulk_created = Signal()
+
+
+@receiver(post_save, sender=TorrentFile)
+@receiver(post_delete, sender=TorrentFile)
+@receiver(post_save, sender=MtCategory)
+@receiver(post_delete, sender=MtCategory)
+@receiver(links_bulk_created, sender=TorrentFile)
+def invalidate_listing_cache(sender, **kwargs):
+    bump_listing_version()
+
+
+@receiver(post_save, sender=MtCategory)
+@receiver(post_delete, sender=MtCategory)
+def invalidate_categories(sender, **kwargs):
+    category_registry.invalidate()
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+@receiver(post_delete, sender=get_user_model())
+def invalidate_tokens(sender, **kwargs):
+    token_cache.invalidate()
+
+
+@receiver(pre_save, sender=get_user_model())
+def remember_user_active(sender, instance, update_fields=None, raw=False, using=None, **kwargs):
+    """Keep whether the stored user is active, the only user field cached tokens depend on."""
+    if raw or instance._state.adding or (update_fields is not None and 'is_active' not in update_fields):
+        # Logins save only last_login
+        return
+    instance._was_active = sender.objects.using(using).filter(pk=instance.pk).values_list(
+        'is_active', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, created, raw=False, **kwargs):
+    was_active = instance.__dict__.pop('_was_active', instance.is_active)
+    if not raw and not created and was_active != instance.is_active:
+        token_cache.invalidate()
+
+
+@receiver(pre_save, sender=TorrentFile)
+def remember_counted_values(sender, instance, raw=False, using=None, **kwargs):
+    """
+    Keep the counter keys of the stored row, to move the counts if an edit
+    changes them, and what the suggestion index holds of it.
+    """
+    if raw or instance._state.adding:
+        return
+    before = sender.objects.using(using).filter(pk=instance.pk).values_list(
+        'category_id', 'uploader', 'uploadTime', 'name'
+    ).first()
+    instance._counter_keys_before = counters.counter_keys(*before[:3]) if before else []
+    instance._suggested_before = (before[3], before[2]) if before else None
+
+
+@receiver(post_save, sender=TorrentFile)
+def count_saved_link(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.count_added([instance], using)
+        return
+    deltas = Counter(counters.keys_for(instance))
+    deltas.subtract(getattr(instance, '_counter_keys_before', []))
+    counters.adjust_counters(deltas, using)
+
+
+@receiver(post_delete, sender=TorrentFile)
+def count_deleted_link(sender, instance, using=None, **kwargs):
+    counters.count_removed([instance], using)
+
+
+@receiver(links_bulk_created, sender=TorrentFile)
+def count_bulk_created_links(sender, files, **kwargs):
+    counters.count_added(files)
+
+
+@receiver(post_save, sender=TorrentFile)
+def record_created_link(sender, created, raw=False, **kwargs):
+    if created and not raw:
+        metrics.links_created.inc(source='single')
+
+
+@receiver(links_bulk_created, sender=TorrentFile)
+def record_bulk_created_links(sender, files, **kwargs):
+    metrics.links_created.inc(len(files), source='bulk')
+
+
+@receiver(post_save, sender=TorrentFile)
+def index_saved_link(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        suggest_index.added()
+    elif getattr(instance, '_suggested_before', None) != (instance.name, instance.uploadTime):
+        # Only renames and moves in upload order; category and other edits leave the index as it is
+        suggest_index.changed()
+
+
+@receiver(links_bulk_created, sender=TorrentFile)
+def index_bulk_created_links(sender, **kwargs):
+    suggest_index.added()
+
+
+@receiver(post_delete, sender=TorrentFile)
+def unindex_deleted_link(sender, **kwargs):
+    suggest_index.changed()
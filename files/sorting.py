@@ -0,0 +1,77 @@
+"""
+Sort orders for link listings, picked with the ``sort`` query parameter.
+
+``sort`` is a column name, prefixed with ``-`` for descending order. Every
+order ends in the primary key, so keyset pagination has a unique position
+for each row, and each has a composite index on TorrentFile that the
+database reads forwards or backwards, so any page of any order is an index
+range scan.
+"""
+from files.pagination import query_string_without
+
+DEFAULT_SORT = '-uploadTime'
+
+# Ascending order for each sortable column; descending reverses every key
+SORT_ORDERINGS = {
+    'category': ('category_id', '-uploadTime', '-id'),
+    'name': ('name', 'id'),
+    'uploadTime': ('uploadTime', 'id'),
+    'uploader': ('uploader', '-uploadTime', '-id'),
+}
+
+# Table columns in display order, with the direction of a first click
+COLUMNS = (
+    ('category', 'Category', 'category'),
+    ('name', 'Name', 'name'),
+    ('uploadTime', 'Added on', '-uploadTime'),
+    ('uploader', 'Posted by', 'uploader'),
+)
+
+
+def reverse_ordering(ordering):
+    return tuple(name[1:] if name.startswith('-') else '-' + name for name in ordering)
+
+
+def sort_ordering(sort):
+    """The ordering for a ``sort`` value, or None if it is not a valid one."""
+    if not sort:
+        return None
+    column = sort[1:] if sort.startswith('-') else sort
+    ordering = SORT_ORDERINGS.get(column)
+    if ordering is None:
+        return None
+    return reverse_ordering(ordering) if sort.startswith('-') else ordering
+
+
+def requested_sort(request, default=DEFAULT_SORT):
+    """(sort, ordering) asked for with ?sort=, falling back to ``default`` when absent or invalid."""
+    sort = request.GET.get('sort')
+    ordering = sort_ordering(sort)
+    if ordering is None:
+        return default, sort_ordering(default) if default else None
+    return sort, ordering
+
+
+def sort_headers(request, sort):
+    """Header links for a listing table: each sorts by its column, or reverses the current order."""
+    base = query_string_without(request, 'sort', 'cursor', 'page')
+    headers = []
+    for column, label, first in COLUMNS:
+        if sort == column:
+            direction, target = 'asc', '-' + column
+        elif sort == '-' + column:
+            direction, target = 'desc', column
+        else:
+            direction, target = None, first
+        headers.append({'label': label, 'url': '?%ssort=%s' % (base, target), 'direction': direction})
+    return headers
+
+
+def pagination_labels(sort):
+    """(previous, next) link labels for keyset pages in ``sort`` order."""
+    if sort == DEFAULT_SORT:
+        return 'Newer', 'Older'
+    if sort == 'uploadTime':
+        return 'Older', 'Newer'
+    return 'Previous', 'Next'
+
@@ -0,0 +1,88 @@
+"""
+Background import of LinkSubmission jobs, the links posted with ?async=1.
+
+A worker claims a batch of pending jobs with one UPDATE that tags them with
+its own id, so several workers never take the same job, and then imports
+the whole batch in one transaction with the code behind /api/links/import/.
+Many small posts thus cost one write transaction instead of one each.
+"""
+import json
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from files.importer import LinkImporter
+from files.models import LinkSubmission
+
+
+def claim(worker, batch_size):
+    """Take up to ``batch_size`` of the oldest pending jobs for ``worker``."""
+    ids = list(
+        LinkSubmission.objects.filter(status=LinkSubmission.PENDING)
+        .order_by('id').values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    LinkSubmission.objects.filter(id__in=ids, status=LinkSubmission.PENDING).update(
+        status=LinkSubmission.PROCESSING, claimed_by=worker, modified_at=timezone.now()
+    )
+    return list(
+        LinkSubmission.objects.filter(claimed_by=worker, status=LinkSubmission.PROCESSING)
+        .select_related('user', 'category').order_by('id')
+    )
+
+
+def reclaim_stale(seconds):
+    """Put jobs back in the queue whose worker has been holding them for over ``seconds``."""
+    cutoff = timezone.now() - timedelta(seconds=seconds)
+    return LinkSubmission.objects.filter(status=LinkSubmission.PROCESSING, modified_at__lt=cutoff).update(
+        status=LinkSubmission.PENDING, claimed_by='', modified_at=timezone.now()
+    )
+
+
+def import_submission(submission, importers):
+    key = (submission.user_id, submission.category_id)
+    if key not in importers:
+        importers[key] = LinkImporter(submission.user, submission.category)
+    lines = [(index, json.dumps(link).encode()) for index, link in enumerate(submission.links, start=1)]
+    results = []
+    for result in importers[key].import_chunk(lines):
+        result['index'] = result.pop('line')
+        results.append(result)
+    submission.results = results
+    submission.status = LinkSubmission.DONE
+    submission.error = ''
+
+
+def save_submissions(submissions):
+    now = timezone.now()
+    for submission in submissions:
+        submission.modified_at = now
+    LinkSubmission.objects.bulk_update(submissions, ['status', 'results', 'error', 'modified_at'])
+
+
+def process_batch(worker, batch_size):
+    """Claim and import one batch of jobs; returns the jobs handled (empty when the queue is)."""
+    submissions = claim(worker, batch_size)
+    if not submissions:
+        return []
+    importers = {}
+    try:
+        with transaction.atomic():
+            for submission in submissions:
+                import_submission(submission, importers)
+            save_submissions(submissions)
+    except Exception:
+        # Keep one broken job from failing the rest: redo the batch a job per transaction
+        for submission in submissions:
+            try:
+                with transaction.atomic():
+                    import_submission(submission, importers)
+                    save_submissions([submission])
+            except Exception as error:
+                submission.status = LinkSubmission.FAILED
+                submission.results = None
+                submission.error = str(error) or type(error).__name__
+                save_submissions([submission])
+    return submissions
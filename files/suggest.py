@@ -0,0 +1,187 @@
+"""
+In-process prefix index for search box suggestions (/api/suggest/).
+
+The words of the SUGGEST_MAX_LINKS most recent link names are kept in a
+sorted list, each word with the links containing it in upload order, so the
+newest links with a word starting with a prefix come from a binary search
+and a merge of those lists, without a query. A prefix starting thousands of
+words, like a single letter, is instead matched against the newest links
+directly. Older links drop out of the index as new ones arrive, which keeps
+its memory bounded.
+
+TorrentFile signals count additions and other changes in the listing cache,
+which every process shares (see files.signals). A process that sees new
+additions loads only the rows past the highest id it has indexed; renames and
+deletions, which are rare, make it rebuild the index from scratch. Other
+edits don't touch what it holds and are ignored.
+"""
+import bisect
+import heapq
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from files.cache import bump_version, get_versions
+from files.categories import category_registry
+from files.models import TorrentFile
+from files.search import tokenize
+
+ADDED_KEY = 'suggest:added'
+GENERATION_KEY = 'suggest:generation'
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+# Most links looked at for one query, which bounds its time
+MAX_SCANNED = 2000
+# Past this many words starting with the prefix, look through the newest links first
+WIDE_PREFIX_WORDS = 200
+# Ids re-read below the highest one indexed, for rows committed after a later id
+CATCH_UP_OVERLAP = 100
+
+
+def prefix_end(prefix):
+    """The smallest string after every string starting with ``prefix``."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def matches_all(words, tokens):
+    """Whether every token is the start of one of ``words``."""
+    return all(any(word.startswith(token) for word in words) for token in tokens)
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._added = None
+        self._generation = None
+        self._reset()
+
+    def _reset(self):
+        self._words = []     # every distinct word, sorted
+        self._postings = {}  # word -> sorted [(uploadTime, id)] of the links containing it
+        self._links = {}     # id -> ((uploadTime, id), name, words)
+        self._order = []     # (uploadTime, id) of every link, oldest first
+        self._last_id = 0
+
+    def __len__(self):
+        return len(self._links)
+
+    def added(self, **kwargs):
+        """Note that links were created. Usable directly as a signal receiver."""
+        bump_version(ADDED_KEY)
+
+    def changed(self, **kwargs):
+        """Note that links were renamed or deleted. Usable directly as a signal receiver."""
+        bump_version(GENERATION_KEY)
+
+    def refresh(self):
+        """Bring the index up to date with the changes counted since it was last used."""
+        added, generation = get_versions(ADDED_KEY, GENERATION_KEY)
+        # Kept until the counters move, so never from a lagging replica
+        links = TorrentFile.objects.using(DEFAULT_DB_ALIAS)
+        with self._lock:
+            if generation != self._generation:
+                recent = links.order_by('-uploadTime', '-id')[:settings.SUGGEST_MAX_LINKS]
+                self._rebuild(recent.values_list('id', 'name', 'uploadTime').iterator())
+            elif added != self._added:
+                since = max(0, self._last_id - CATCH_UP_OVERLAP)
+                rows = links.filter(id__gt=since).order_by('id')
+                for pk, name, upload_time in rows.values_list('id', 'name', 'uploadTime').iterator():
+                    self._add(pk, name, upload_time)
+            self._added, self._generation = added, generation
+
+    def _rebuild(self, rows):
+        """Index ``rows`` of (id, name, uploadTime) from scratch, sorting once at the end."""
+        self._reset()
+        for pk, name, upload_time in rows:
+            key = (upload_time, pk)
+            words = frozenset(tokenize(name))
+            self._links[pk] = (key, name, words)
+            for word in words:
+                self._postings.setdefault(word, []).append(key)
+            self._last_id = max(self._last_id, pk)
+        for postings in self._postings.values():
+            postings.sort()
+        self._words = sorted(self._postings)
+        self._order = sorted(key for key, name, words in self._links.values())
+
+    def _add(self, pk, name, upload_time):
+        self._last_id = max(self._last_id, pk)
+        key = (upload_time, pk)
+        full = len(self._order) >= settings.SUGGEST_MAX_LINKS
+        if pk in self._links or (full and self._order and key < self._order[0]):
+            return
+        words = frozenset(tokenize(name))
+        bisect.insort(self._order, key)
+        for word in words:
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = []
+                bisect.insort(self._words, word)
+            bisect.insort(postings, key)
+        self._links[pk] = (key, name, words)
+        while len(self._order) > settings.SUGGEST_MAX_LINKS:
+            self._remove(self._order[0][1])
+
+    def _remove(self, pk):
+        key, name, words = self._links.pop(pk)
+        del self._order[bisect.bisect_left(self._order, key)]
+        for word in words:
+            postings = self._postings[word]
+            del postings[bisect.bisect_left(postings, key)]
+            if not postings:
+                del self._postings[word]
+                del self._words[bisect.bisect_left(self._words, word)]
+
+    def suggest(self, query, limit=DEFAULT_LIMIT):
+        """
+        (id, name) of the newest links where every word of ``query`` starts
+        a word of the name, at most ``limit`` of them.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        self.refresh()
+        # The longest word narrows the candidates the most
+        prefix = max(tokens, key=len)
+        others = [token for token in tokens if token != prefix]
+        with self._lock:
+            start = bisect.bisect_left(self._words, prefix)
+            end = bisect.bisect_left(self._words, prefix_end(prefix), start)
+            if end - start > WIDE_PREFIX_WORDS:
+                # Short, common prefixes match among the newest links straight away
+                results = self._first_matches(reversed(self._order), tokens, limit)
+                if len(results) == limit:
+                    return results
+            newest_first = heapq.merge(
+                *(reversed(self._postings[word]) for word in self._words[start:end]), reverse=True
+            )
+            return self._first_matches(newest_first, others, limit)
+
+    def _first_matches(self, keys, tokens, limit):
+        """(id, name) of the links in ``keys`` matching ``tokens``, stopping after MAX_SCANNED links."""
+        results, seen = [], set()
+        for scanned, (upload_time, pk) in enumerate(keys):
+            if len(results) >= limit or scanned >= MAX_SCANNED:
+                break
+            if pk in seen:
+                continue
+            seen.add(pk)
+            key, name, words = self._links[pk]
+            if matches_all(words, tokens):
+                results.append((pk, name))
+        return results
+
+
+def suggest_categories(query, limit=DEFAULT_LIMIT):
+    """Categories, by name, where every word of ``query`` starts a word of the category name."""
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    return [
+        category for category in category_registry.all() if matches_all(tokenize(category.name), tokens)
+    ][:limit]
+
+
+suggest_index = SuggestIndex()
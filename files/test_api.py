@@ -5,6 +5,9 @@ from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
 from rest_framework import status
 import json
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from .models import TorrentFile, MtCategory
 
 
@@ -114,12 +117,42 @@ class APILinkPostingTest(APITestCase):
             self.assertEqual(created_file['location'], data['links'][i])
             self.assertIn('file', created_file['name'])
 
+    def test_bulk_links_duplicate_within_batch(self):
+        """Test that a batch repeating a link is rejected without creating anything"""
+        data = {
+            'links': [
+                'fopnu://file:/test/repeat.txt',
+                'fopnu://file:/test/unique.txt',
+                'fopnu://file:/test/repeat.txt'
+            ]
+        }
+        response = self.client.post(self.bulk_links_url, data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('appears more than once in this batch', str(response.data['links']))
+        self.assertFalse(TorrentFile.objects.exists())
+
+    def test_bulk_links_query_count_is_constant(self):
+        """Test that bulk posting costs the same number of queries for 5 or 50 links"""
+        def post_batch(prefix, size):
+            links = [f'fopnu://file:/test/{prefix}{i}.txt' for i in range(size)]
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(self.bulk_links_url, {'links': links}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual([f['location'] for f in response.data['created']], links)
+            self.assertTrue(all(f['id'] for f in response.data['created']))
+            return len(ctx.captured_queries)
+
+        # The first post of the day also creates this uploader's counter rows
+        post_batch('warm', 1)
+        self.assertEqual(post_batch('small', 5), post_batch('large', 50))
+
     def test_bulk_links_too_many(self):
         """Test bulk creation with too many links fails"""
-        links = [f'fopnu://file:/test/file{i}.txt' for i in range(101)]
+        links = [f'fopnu://file:/test/file{i}.txt' for i in range(settings.BULK_LINKS_MAX_BATCH + 1)]
         data = {'links': links}
         
-        response = self.client.post(self.bulk_links_url, data)
+        response = self.client.post(self.bulk_links_url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_list_user_links(self):
@@ -146,10 +179,37 @@ class APILinkPostingTest(APITestCase):
         response = self.client.get(self.links_url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)  # Only user's own files
-        for file_data in response.data:
+        self.assertEqual(len(response.data['results']), 2)  # Only user's own files
+        for file_data in response.data['results']:
             self.assertEqual(file_data['uploader'], 'testuser')
 
+    def test_list_user_links_paginated_by_default(self):
+        """Test that the link list returns one page and a link to the next"""
+        for i in range(25):
+            TorrentFile.objects.create(name=f'File {i}', location=f'fopnu://file:/test/page{i}.txt', uploader='testuser')
+
+        response = self.client.get(self.links_url)
+
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual(len(self.client.get(response.data['next']).data['results']), 5)
+
+    def test_list_user_links_fields(self):
+        """Test that ?fields= limits the serialized fields and the columns read"""
+        TorrentFile.objects.create(name='Test File 1', location='fopnu://file:/test/file1.txt', uploader='testuser')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.links_url, {'fields': 'id,location,bogus'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'location'})
+        listing_sql = [q['sql'] for q in ctx.captured_queries if 'FROM "files_torrentfile"' in q['sql'] and 'LIMIT' in q['sql']]
+        self.assertEqual(len(listing_sql), 1)
+        self.assertNotIn('"name"', listing_sql[0])
+
+        response = self.client.get(self.links_url, {'fields': 'name,category'})
+        self.assertEqual(set(response.data['results'][0]), {'name', 'category'})
+
     def test_fopnu_link_name_extraction(self):
         """Test that Fopnu link names are extracted correctly"""
         test_cases = [
@@ -175,6 +235,74 @@ class APILinkPostingTest(APITestCase):
             self.assertEqual(response.data['name'], test_case['expected_name'])
 
 
+class APIStreamingImportTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+        self.category = MtCategory.objects.create(name='Test Category')
+        self.other_category = MtCategory.objects.create(name='Other Category')
+        self.import_url = reverse('api_import_links')
+        TorrentFile.objects.create(
+            name='existing.txt',
+            location='fopnu://file:/test/existing.txt',
+            uploader='someone'
+        )
+
+    def post_lines(self, lines, **params):
+        url = self.import_url
+        if params:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+        response = self.client.generic('POST', url, '\n'.join(lines).encode(), content_type='text/plain')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_import_plain_and_ndjson_lines(self):
+        """Test that bare links and NDJSON lines are imported with per-line results"""
+        results = self.post_lines([
+            'fopnu://file:/test/plain.txt',
+            '',
+            json.dumps({'location': 'fopnu://file:/test/object.txt', 'category_id': self.other_category.id}),
+            json.dumps('fopnu://file:/test/string.txt'),
+            'fopnu://file:/test/existing.txt',
+            'fopnu://file:/test/plain.txt',
+            '{broken',
+            json.dumps({'location': 'fopnu://file:/test/bad-category.txt', 'category_id': 9999}),
+        ], category_id=self.category.id)
+
+        self.assertEqual([r['line'] for r in results], [1, 3, 4, 5, 6, 7, 8])
+        self.assertEqual(
+            [r['status'] for r in results],
+            ['created', 'created', 'created', 'duplicate', 'duplicate', 'invalid', 'invalid']
+        )
+        self.assertEqual(results[3]['existing_id'], TorrentFile.objects.get(location='fopnu://file:/test/existing.txt').id)
+
+        plain = TorrentFile.objects.get(id=results[0]['id'])
+        self.assertEqual((plain.name, plain.uploader, plain.category), ('plain.txt', 'testuser', self.category))
+        self.assertEqual(TorrentFile.objects.get(id=results[1]['id']).category, self.other_category)
+
+    def test_import_commits_in_chunks(self):
+        """Test that duplicates are caught across chunk boundaries"""
+        lines = [f'fopnu://file:/test/chunked{i}.txt' for i in range(7)] + ['fopnu://file:/test/chunked0.txt']
+        results = self.post_lines(lines, chunk_size=3)
+
+        self.assertEqual([r['status'] for r in results], ['created'] * 7 + ['duplicate'])
+        self.assertEqual(results[-1]['existing_id'], results[0]['id'])
+        self.assertEqual(TorrentFile.objects.filter(uploader='testuser').count(), 7)
+
+    def test_import_requires_authentication(self):
+        """Test that importing without a token fails"""
+        self.client.credentials()
+        response = self.client.generic('POST', self.import_url, b'fopnu://file:/test/x.txt', content_type='text/plain')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
 class APICategoryTest(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -0,0 +1,74 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from files.authentication import token_cache
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('api_categories')
+
+    def test_repeat_requests_skip_token_lookup(self):
+        """Test that a token seen before is authenticated without a query"""
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_deleted_token_rejected(self):
+        """Test that deleting a token takes effect immediately"""
+        self.client.get(self.url)
+        self.token.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_rotated_token(self):
+        """Test that after rotation the old key fails and the new one works"""
+        self.client.get(self.url)
+        self.token.delete()
+        new_token = Token.objects.create(user=self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + new_token.key)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_deactivated_user_rejected(self):
+        """Test that deactivating the user drops their cached token"""
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_login_keeps_cache(self):
+        """Test that saving a user without deactivating them, as logging in does, keeps cached tokens"""
+        self.client.get(self.url)
+        self.assertTrue(Client().login(username='testuser', password='testpass123'))
+        self.user.refresh_from_db()
+        self.user.email = 'test@example.com'
+        self.user.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(TOKEN_AUTH_CACHE_SIZE=2)
+    def test_cache_is_bounded(self):
+        """Test that the least recently used token is evicted past the size limit"""
+        keys = [self.token.key] + [
+            Token.objects.create(user=User.objects.create_user(username=f'bot{i}')).key for i in range(2)
+        ]
+        for key in keys:
+            self.client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+            self.client.get(self.url)
+        self.assertIsNone(token_cache.get(keys[0]))
+        self.assertIsNotNone(token_cache.get(keys[2]))
+
+    @override_settings(TOKEN_AUTH_CACHE_TTL=0)
+    def test_entries_expire(self):
+        """Test that an entry past its TTL is looked up again"""
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
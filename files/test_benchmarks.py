@@ -0,0 +1,31 @@
+from django.test import TestCase
+
+from files.benchmarks import compare_results, parse_size, run_benchmarks, seed_catalog
+from files.counters import total_links
+from files.models import TorrentFile
+
+
+class HotPathBenchmarkTest(TestCase):
+    def test_parse_size(self):
+        """Test that catalog sizes accept k and m suffixes"""
+        self.assertEqual([parse_size(size) for size in ('10k', '1M', '2.5k', '300')], [10000, 1000000, 2500, 300])
+
+    def test_seed_and_run(self):
+        """Test that a small catalog is seeded with counters and every hot path runs without errors"""
+        seed_catalog(300, users=5, batch_size=100)
+        self.assertEqual(TorrentFile.objects.count(), 300)
+        self.assertEqual(total_links(), 300)
+
+        results = run_benchmarks(count=2, warmup=1, bulk_size=3)
+        self.assertEqual(set(results), {'index', 'search', 'profile', 'get_name', 'api_links', 'api_bulk'})
+        for name, result in results.items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertGreater(result['queries']['mean'], 0, name)
+            self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['max'])
+        # Three uploads plus three bulk posts of three links each
+        self.assertEqual(TorrentFile.objects.count(), 300 + 3 + 3 * 3)
+
+        report = {'results': results}
+        rows = compare_results(report, report)
+        self.assertEqual(len(rows), 6 * 4)
+        self.assertTrue(all(change == 0 for _, _, _, _, change in rows))
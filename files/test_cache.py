@@ -0,0 +1,120 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from files.cache import bump_version, get_version, get_versions
+from files.models import TorrentFile, MtCategory
+from unchainedTorrent.caches import cache_from_env, is_process_local
+
+
+class ListingCacheTest(TestCase):
+    def setUp(self):
+        """Set up a category and a file, starting from an empty cache"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.category = MtCategory.objects.create(name='Movies')
+        self.torrent_file = TorrentFile.objects.create(
+            name='Cached Movie', uploader='testuser',
+            location='fopnu://file:/cached-movie.mkv', category=self.category
+        )
+
+    def test_anonymous_home_page_served_from_cache(self):
+        """Test that a repeated anonymous request runs no queries"""
+        first = self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('home'))
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.content, second.content)
+
+    def test_cache_is_keyed_on_parameters(self):
+        """Test that different search parameters are cached separately"""
+        self.client.get(reverse('search'), {'q': 'cached'})
+        response = self.client.get(reverse('search'), {'q': 'nothing'})
+        self.assertNotContains(response, 'Cached Movie')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('search'), {'q': 'cached'})
+        self.assertContains(response, 'Cached Movie')
+
+    def test_logged_in_users_bypass_cache(self):
+        """Test that logged-in requests are rendered every time"""
+        self.client.get(reverse('home'))
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('home'))
+        self.assertIsNotNone(response.context)
+
+    def test_save_and_delete_invalidate(self):
+        """Test that file and category changes show up on the next request"""
+        self.client.get(reverse('home'))
+
+        TorrentFile.objects.create(name='Fresh Upload', uploader='testuser', location='fopnu://file:/fresh.mkv')
+        self.assertContains(self.client.get(reverse('home')), 'Fresh Upload')
+
+        self.category.name = 'Films'
+        self.category.save()
+        self.assertContains(self.client.get(reverse('home')), 'Films')
+
+        self.torrent_file.delete()
+        self.assertNotContains(self.client.get(reverse('home')), 'Cached Movie')
+
+    def test_bulk_create_invalidates(self):
+        """Test that links posted in bulk, which skip post_save, still invalidate"""
+        self.client.get(reverse('home'))
+
+        api_client = APIClient()
+        token = Token.objects.create(user=self.user)
+        api_client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        response = api_client.post(reverse('api_bulk_links'), {'links': ['fopnu://file:/bulk-one.mkv']})
+        self.assertEqual(response.status_code, 201)
+
+        self.assertContains(self.client.get(reverse('home')), 'bulk-one.mkv')
+
+
+class VersionCounterTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(LISTING_CACHE_TIMEOUT=None)
+    def test_counters_start_from_clock_and_move(self):
+        """Test that a missing counter starts past any earlier value, and bumping moves only that counter"""
+        with mock.patch('files.cache.time.time', return_value=1000.0):
+            self.assertEqual(get_versions('a', 'b'), [1000000, 1000000])
+        bump_version('a')
+        self.assertEqual(get_versions('a', 'b'), [1000001, 1000000])
+
+    @override_settings(LISTING_CACHE_TIMEOUT=60)
+    def test_counters_lapse_on_process_local_cache(self):
+        """Test that counters expire with the pages, so other processes' changes are picked up eventually"""
+        version = get_version('a')
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + 61):
+            self.assertNotEqual(get_version('a'), version)
+
+
+class CacheFromEnvTest(SimpleTestCase):
+    def test_default_is_process_local(self):
+        """Test that without CACHE_URL the local memory default is used"""
+        config = cache_from_env({}, 'locmem://nulinks')
+        self.assertEqual(config, {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'nulinks'})
+        self.assertTrue(is_process_local(config))
+
+    def test_shared_backends(self):
+        """Test that memcached, file and database URLs give caches shared between processes"""
+        config = cache_from_env({'CACHE_URL': 'memcached://cache1:11211,cache2:11211'}, 'locmem://unused')
+        self.assertEqual(config['BACKEND'], 'django.core.cache.backends.memcached.PyMemcacheCache')
+        self.assertEqual(config['LOCATION'], ['cache1:11211', 'cache2:11211'])
+        self.assertFalse(is_process_local(config))
+        config = cache_from_env({'CACHE_URL': 'file:///var/cache/nulinks'}, 'locmem://unused')
+        self.assertEqual(config['LOCATION'], '/var/cache/nulinks')
+        config = cache_from_env({'CACHE_URL': 'db://nulinks_cache'}, 'locmem://unused')
+        self.assertEqual(config['LOCATION'], 'nulinks_cache')
+
+    def test_unknown_scheme(self):
+        """Test that an unsupported scheme is reported rather than ignored"""
+        with self.assertRaises(ValueError):
+            cache_from_env({'CACHE_URL': 'redis://cache/0'}, 'locmem://unused')
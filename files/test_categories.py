@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from files.categories import category_registry
+from files.forms import TorrentFileForm, TorrentFileEditForm
+from files.models import MtCategory
+
+
+class CategoryRegistryTest(TestCase):
+    def setUp(self):
+        self.music = MtCategory.objects.create(name='Music')
+        self.movies = MtCategory.objects.create(name='Movies')
+
+    def test_loaded_once(self):
+        """Test that the sorted list is only queried on first use"""
+        self.assertEqual(category_registry.all(), [self.movies, self.music])
+        with self.assertNumQueries(0):
+            self.assertEqual(category_registry.all(), [self.movies, self.music])
+            self.assertEqual(category_registry.get(str(self.music.id)), self.music)
+            self.assertIsNone(category_registry.get('not-a-number'))
+
+    def test_signals_invalidate(self):
+        """Test that creating, renaming and deleting categories bump the version"""
+        version = category_registry.version
+        software = MtCategory.objects.create(name='Software')
+        self.assertNotEqual(category_registry.version, version)
+        self.assertIn(software, category_registry.all())
+
+        software.name = 'Apps'
+        software.save()
+        self.assertEqual([c.name for c in category_registry.all()], ['Apps', 'Movies', 'Music'])
+
+        software.delete()
+        self.assertEqual(category_registry.all(), [self.movies, self.music])
+
+    def test_forms_use_registry(self):
+        """Test that rendering the upload and edit forms runs no category query"""
+        category_registry.all()
+        with self.assertNumQueries(0):
+            for form in (TorrentFileForm(), TorrentFileEditForm()):
+                html = str(form['category'])
+                self.assertIn('Movies', html)
+                self.assertLess(html.index('Movies'), html.index('Music'))
+
+    def test_forms_still_validate_category(self):
+        """Test that the form rejects category ids that do not exist"""
+        form = TorrentFileForm(data={'location': 'fopnu://file:/new.mkv', 'category': 9999})
+        self.assertFalse(form.is_valid())
+        self.assertIn('category', form.errors)
+
+
+class CategoryListETagTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        MtCategory.objects.create(name='Movies')
+
+    def test_not_modified_until_categories_change(self):
+        """Test that a matching If-None-Match gets 304 until a category changes"""
+        response = self.client.get(reverse('api_categories'))
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get(reverse('api_categories'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        MtCategory.objects.create(name='Music')
+        response = self.client.get(reverse('api_categories'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data), 2)
@@ -0,0 +1,93 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from files.models import TorrentFile, MtCategory
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.category = MtCategory.objects.create(name='Movies')
+        self.torrent_file = TorrentFile.objects.create(
+            name='Validated Movie', uploader='testuser',
+            location='fopnu://file:/validated.mkv', category=self.category
+        )
+        self.client = Client()
+        self.api_client = APIClient()
+        token = Token.objects.create(user=self.user)
+        self.api_client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def assertRevalidates(self, client, url, change, params=None):
+        """The listing answers 304 for its own ETag, and 200 again after ``change()``"""
+        response = client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        # Deletes would not move it, so If-Modified-Since alone could confirm stale copies
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        response = client.get(url, params or {}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        change()
+        response = client.get(url, params or {}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def add_file(self):
+        TorrentFile.objects.create(name='Another Movie', uploader='testuser', location='fopnu://file:/another.mkv')
+
+    def test_index(self):
+        """Test that the home page revalidates until a link is added"""
+        self.assertRevalidates(self.client, reverse('home'), self.add_file)
+
+    def test_index_after_delete(self):
+        """Test that deleting a link changes the validators"""
+        self.add_file()
+        self.assertRevalidates(self.client, reverse('home'), self.torrent_file.delete)
+
+    def test_search(self):
+        """Test that search revalidates until a matching link is renamed"""
+        def rename():
+            self.torrent_file.name = 'Validated Film'
+            self.torrent_file.save()
+        self.assertRevalidates(self.client, reverse('search'), rename, {'q': 'validated'})
+
+    def test_category_rename(self):
+        """Test that renaming a category shown in the listing changes the validators"""
+        def rename():
+            self.category.name = 'Films'
+            self.category.save()
+        self.assertRevalidates(self.client, reverse('home'), rename)
+
+    def test_index_not_modified_without_link_query(self):
+        """Test that revalidating the home page runs no query over the links"""
+        etag = self.client.get(reverse('home'))['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if 'files_torrentfile' in q['sql']])
+
+    def test_api_links(self):
+        """Test that /api/links/ returns 304 without serializing anything"""
+        self.assertRevalidates(self.api_client, reverse('api_links'), self.add_file)
+
+    def test_api_links_not_modified_cost(self):
+        """Test that a 304 from /api/links/ costs only the aggregate once the token is cached"""
+        etag = self.api_client.get(reverse('api_links'))['ETag']
+        with self.assertNumQueries(1):
+            response = self.api_client.get(reverse('api_links'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_api_categories(self):
+        """Test that /api/categories/ revalidates until a category is added"""
+        self.assertRevalidates(
+            self.api_client, reverse('api_categories'),
+            lambda: MtCategory.objects.create(name='Music')
+        )
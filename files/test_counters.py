@@ -0,0 +1,93 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from files.counters import category_counts
+from files.models import TorrentFile, MtCategory, CategoryLinkCount, UploaderLinkCount, DailyLinkCount
+
+
+class LinkCounterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.movies = MtCategory.objects.create(name='Movies')
+        self.music = MtCategory.objects.create(name='Music')
+        self.created = 0
+
+    def add_file(self, category=None, uploader='testuser'):
+        self.created += 1
+        return TorrentFile.objects.create(
+            name=f'Counted {self.created}', uploader=uploader,
+            location=f'fopnu://file:/counted-{self.created}', category=category
+        )
+
+    def snapshot(self):
+        return (
+            category_counts(),
+            dict(UploaderLinkCount.objects.values_list('uploader', 'count')),
+            dict(DailyLinkCount.objects.values_list('day', 'count')),
+        )
+
+    def test_create_move_and_delete(self):
+        """Test that counters follow inserts, category changes and deletes"""
+        first = self.add_file(self.movies)
+        self.add_file(self.movies)
+        self.add_file(uploader='other')
+        today = timezone.localdate()
+        self.assertEqual(self.snapshot(), (
+            {self.movies.id: 2},
+            {'testuser': 2, 'other': 1},
+            {today: 3},
+        ))
+
+        first.category = self.music
+        first.save()
+        self.assertEqual(category_counts(), {self.movies.id: 1, self.music.id: 1})
+
+        first.delete()
+        self.assertEqual(self.snapshot(), (
+            {self.movies.id: 1, self.music.id: 0},
+            {'testuser': 1, 'other': 1},
+            {today: 2},
+        ))
+
+    def test_bulk_created_links_are_counted(self):
+        """Test that links posted through the bulk API are counted"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        links = [f'fopnu://file:/bulk-{i}' for i in range(4)]
+        client.post(reverse('api_bulk_links'), {'links': links, 'category_id': self.music.id}, format='json')
+        self.assertEqual(category_counts(), {self.music.id: 4})
+        self.assertEqual(UploaderLinkCount.objects.get(pk='testuser').count, 4)
+
+    def test_rebuild_matches_incremental(self):
+        """Test that the rebuild command recounts drifted counters from the table"""
+        self.add_file(self.movies)
+        old = self.add_file(self.music)
+        TorrentFile.objects.filter(pk=old.pk).update(uploadTime=old.uploadTime - timedelta(days=3))
+        # update() skips signals, so the counters drift
+        TorrentFile.objects.filter(category=self.movies).update(category=self.music)
+        CategoryLinkCount.objects.filter(pk=self.movies.pk).update(count=99)
+
+        out = StringIO()
+        call_command('rebuild_link_counters', stdout=out)
+
+        self.assertIn('1 categories, 1 uploaders, 2 days', out.getvalue())
+        self.assertEqual(self.snapshot(), (
+            {self.music.id: 2},
+            {'testuser': 2},
+            {timezone.localdate(): 1, timezone.localdate(old.uploadTime) - timedelta(days=3): 1},
+        ))
+
+    def test_search_dropdown_shows_counts(self):
+        """Test that the category dropdown lists how many links each category has"""
+        self.add_file(self.movies)
+        self.add_file(self.movies)
+        response = Client().get(reverse('search'))
+        self.assertContains(response, 'Movies (2)</option>', html=False)
+        self.assertContains(response, 'Music (0)</option>', html=False)
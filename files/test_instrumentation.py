@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from files.models import TorrentFile
+from unchainedTorrent.instrumentation import QueryBudgetExceeded
+
+LOGGER = 'unchainedTorrent.instrumentation'
+
+
+class QueryInstrumentationTest(TestCase):
+    def setUp(self):
+        TorrentFile.objects.create(name='Movie', uploader='someone', location='fopnu://file:/movie.mkv')
+
+    @override_settings(SERVER_TIMING=True)
+    def test_logs_and_server_timing(self):
+        """Test that each request is logged with its query count and timed in Server-Timing"""
+        with self.assertLogs(LOGGER, 'INFO') as logs:
+            response = self.client.get(reverse('search'), {'q': 'movie'})
+        record = logs.records[0]
+        self.assertEqual(record.view, 'search')
+        self.assertGreater(record.query_count, 0)
+        self.assertIn('files_torrentfile', record.slowest_sql)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="%d queries"' % record.query_count, response['Server-Timing'])
+
+    def test_streamed_queries_counted(self):
+        """Test that a streamed response is logged once its body, and the queries it runs, are done"""
+        token = Token.objects.create(user=User.objects.create_user(username='importer', password='testpass123'))
+        with self.assertLogs(LOGGER, 'INFO') as logs:
+            response = self.client.post(
+                reverse('api_import_links'), b'fopnu://file:/streamed.mkv', content_type='text/plain',
+                HTTP_AUTHORIZATION='Token ' + token.key,
+            )
+            self.assertEqual(logs.records, [])
+            b''.join(response.streaming_content)
+        self.assertEqual(logs.records[0].view, 'api_import_links')
+        self.assertGreater(logs.records[0].query_count, 0)
+        self.assertTrue(TorrentFile.objects.filter(name='streamed.mkv').exists())
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_off(self):
+        """Test that the header can be turned off"""
+        self.assertFalse(self.client.get(reverse('home')).has_header('Server-Timing'))
+
+    @override_settings(QUERY_BUDGETS={'home': 0, 'upload': 0}, QUERY_BUDGET_STRICT=False)
+    def test_budget_logged(self):
+        """Test that going over a view's query budget is logged, and writes are not budgeted"""
+        with self.assertLogs(LOGGER, 'WARNING') as logs:
+            self.client.get(reverse('home'))
+        self.assertIn('over its budget of 0', logs.output[0])
+
+        self.client.force_login(User.objects.create_user(username='poster', password='testpass123'))
+        with self.assertLogs(LOGGER, 'INFO') as logs:
+            self.client.post(reverse('upload'), {'location': 'fopnu://file:/new.mkv'})
+        self.assertEqual([record.levelname for record in logs.records], ['INFO'])
+
+    def test_test_runner_is_strict(self):
+        """Test that the test runner turns strict budgets on for the whole suite"""
+        self.assertTrue(settings.QUERY_BUDGET_STRICT)
+
+    @override_settings(QUERY_BUDGETS={'home': 0}, QUERY_BUDGET_STRICT=True)
+    def test_budget_strict(self):
+        """Test that a strict budget fails the request, as it does throughout the test suite"""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('home'))
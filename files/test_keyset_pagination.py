@@ -0,0 +1,142 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from files.models import TorrentFile, MtCategory
+from files.pagination import KeysetPaginator
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        """Create 45 files, with pairs sharing an upload time to exercise the id tiebreak"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.category = MtCategory.objects.create(name='Movies')
+        base_time = timezone.now()
+        for i in range(45):
+            TorrentFile.objects.create(
+                name=f'Keyset Movie {i}',
+                uploader='testuser',
+                location=f'fopnu://file:/keyset-movie-{i}.mkv',
+                category=self.category,
+            )
+        for torrent_file in TorrentFile.objects.all():
+            TorrentFile.objects.filter(pk=torrent_file.pk).update(
+                uploadTime=base_time - timedelta(minutes=torrent_file.pk // 2)
+            )
+        self.expected = list(TorrentFile.objects.order_by('-uploadTime', '-id'))
+        self.client = Client()
+
+    def test_walk_forward_and_back(self):
+        """Test that following cursors visits every row once, in order, both ways"""
+        paginator = KeysetPaginator(TorrentFile.objects.all(), 20)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        self.assertEqual([obj for page in pages for obj in page], self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        back = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[1]))
+        first = paginator.get_page(back.previous_cursor)
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertFalse(first.has_previous())
+
+    def test_invalid_cursor_gives_first_page(self):
+        """Test that a tampered cursor falls back to the first page"""
+        page = KeysetPaginator(TorrentFile.objects.all(), 20).get_page('not-a-cursor')
+        self.assertEqual(list(page), self.expected[:20])
+
+    def test_mistyped_cursor_gives_first_page(self):
+        """Test that a well-formed cursor with values of the wrong type falls back to the first page"""
+        def cursor(*values):
+            payload = json.dumps({'d': 'next', 'v': list(values)})
+            return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+        api_client = APIClient()
+        api_client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        for values in (
+            ('2020-01-01T00:00:00+00:00', 'abc'),
+            ({'a': 1}, 1),
+            (1, 1),
+            ('2020-01-01', 1),
+            (None, 1),
+            ('2020-01-01T00:00:00+00:00', [1]),
+        ):
+            with self.subTest(values=values):
+                page = KeysetPaginator(TorrentFile.objects.all(), 20).get_page(cursor(*values))
+                self.assertEqual(list(page), self.expected[:20])
+                response = self.client.get(reverse('home'), {'cursor': cursor(*values)})
+                self.assertEqual(list(response.context['tFiles']), self.expected[:20])
+                response = self.client.get(reverse('search'), {'q': 'keyset', 'cursor': cursor({}, *values)})
+                self.assertEqual(response.status_code, 200)
+                response = api_client.get(reverse('api_links'), {'cursor': cursor(*values)})
+                self.assertEqual([f['id'] for f in response.data['results']], [f.id for f in self.expected[:20]])
+
+    def test_no_offset_or_count_queries(self):
+        """Test that a deep page is a single bounded query"""
+        paginator = KeysetPaginator(TorrentFile.objects.all(), 20)
+        cursor = paginator.get_page().next_cursor
+        with self.assertNumQueries(1) as ctx:
+            paginator.get_page(cursor)
+        sql = ctx.captured_queries[0]['sql'].upper()
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(', sql)
+
+    def test_estimated_count(self):
+        """Test that the optional count reports the total number of rows"""
+        paginator = KeysetPaginator(TorrentFile.objects.all(), 20)
+        self.assertEqual(paginator.estimated_count, 45)
+
+    def test_index_cursor_mode(self):
+        """Test that the home page switches to keyset pages when given a cursor"""
+        response = self.client.get(reverse('home'))
+        older_cursor = response.context['older_cursor']
+        self.assertIsNotNone(older_cursor)
+
+        response = self.client.get(reverse('home'), {'cursor': older_cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['keyset'])
+        self.assertEqual(list(response.context['tFiles']), self.expected[20:40])
+        self.assertContains(response, 'Newer')
+
+    def test_search_pages_keep_query(self):
+        """Test that search pages by cursor and the links keep the search terms"""
+        response = self.client.get(reverse('search'), {'q': 'keyset', 'category': self.category.id})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 20)
+        self.assertContains(response, 'q=keyset')
+
+        response = self.client.get(reverse('search'), {'q': 'keyset', 'cursor': page_obj.next_cursor})
+        second = list(response.context['tFiles'])
+        self.assertEqual(len(second), 20)
+        self.assertFalse(set(second) & set(page_obj))
+
+    def test_profile_is_paginated(self):
+        """Test that the profile page lists one page of the user's links"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(list(response.context['tFiles']), self.expected[:20])
+        self.assertTrue(response.context['page_obj'].has_next())
+
+    def test_api_pagination(self):
+        """Test that the API pages by cursor and can report an estimated total"""
+        api_client = APIClient()
+        token = Token.objects.create(user=self.user)
+        api_client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+        response = api_client.get(reverse('api_links'), {'page_size': 20, 'count': 1})
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(response.data['estimated_count'], 45)
+        self.assertIsNone(response.data['previous'])
+
+        response = api_client.get(response.data['next'])
+        self.assertEqual([f['id'] for f in response.data['results']], [f.id for f in self.expected[20:40]])
+        self.assertIsNotNone(response.data['previous'])
@@ -0,0 +1,48 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from files.linkparse import DEFAULT_NAME, ParsedLink, normalize_location, parse_link, parse_links
+from files.management.commands.benchmark_linkparse import legacy_parse, make_corpus
+
+
+class ParseLinkTest(SimpleTestCase):
+    def test_fopnu_links(self):
+        """Test that Fopnu links are split into kind and a decoded display name"""
+        self.assertEqual(
+            parse_link('fopnu://file:/Movies/Action/Sample%20Movie.mkv'),
+            ParsedLink('fopnu', 'file', 'Sample Movie.mkv', 'fopnu://file:/Movies/Action/Sample Movie.mkv'),
+        )
+        self.assertEqual(parse_link('FOPNU://User:/some/user/path').kind, 'user')
+        self.assertEqual(parse_link('fopnu://chat:/Lobby').name, 'Lobby')
+        self.assertEqual(parse_link('fopnu://file:/folder/').name, 'fopnu://file:/folder/')
+
+    def test_other_links(self):
+        """Test that links that are not Fopnu links keep their location as their name"""
+        self.assertEqual(
+            parse_link('regular_url_not_fopnu'),
+            ParsedLink(None, None, 'regular_url_not_fopnu', 'regular_url_not_fopnu'),
+        )
+        parsed = parse_link('  HTTPS://example.com/file:/a%20b  ')
+        self.assertEqual((parsed.scheme, parsed.name), ('https', 'HTTPS://example.com/file:/a%20b'))
+        self.assertEqual(parse_link('').name, DEFAULT_NAME)
+        self.assertEqual(parse_link(None).key, '')
+
+    def test_keys_match_previous_normalization(self):
+        """Test that existing location keys stay valid: the new key equals the old one over a corpus"""
+        corpus = make_corpus(2000, seed=7) + ['A b:c://X%2FY', 'no scheme %41', ' ://x ']
+        for link in corpus:
+            self.assertEqual(normalize_location(link), legacy_parse(link)[1], link)
+
+    def test_batch(self):
+        """Test that parse_links() keeps order and repeats"""
+        links = ['fopnu://file:/a', 'fopnu://file:/b', 'fopnu://file:/a']
+        self.assertEqual(parse_links(links), [parse_link(link) for link in links])
+
+    def test_benchmark_command(self):
+        """Test that the microbenchmark runs and finds no normalization changes"""
+        out, err = StringIO(), StringIO()
+        call_command('benchmark_linkparse', links=200, repeat=1, stdout=out, stderr=err)
+        self.assertIn('parse_links', out.getvalue())
+        self.assertEqual(err.getvalue(), '')
@@ -0,0 +1,133 @@
+import re
+import threading
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from files.models import TorrentFile
+from unchainedTorrent.metrics import Counter, Histogram, Registry
+
+SAMPLE = re.compile(r'^(\w+)(\{[^}]*\})? (\S+)$')
+
+
+def scrape(client):
+    """{(name, labels): value} from /metrics."""
+    response = client.get(reverse('metrics'))
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    samples = {}
+    for line in response.content.decode().splitlines():
+        if line and not line.startswith('#'):
+            name, labels, value = SAMPLE.match(line).groups()
+            samples[name, labels or ''] = float(value)
+    return samples
+
+
+class RegistryTest(SimpleTestCase):
+    def test_threads_are_summed(self):
+        """Test that values recorded in separate threads are added up at scrape time"""
+        registry = Registry()
+        posts = Counter('posts_total', 'Posts.', ['kind'], registry=registry)
+        latency = Histogram('latency_seconds', 'Latency.', buckets=(0.1, 1), registry=registry)
+
+        def work():
+            for _ in range(1000):
+                posts.inc(kind='single')
+            latency.observe(0.5)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        latency.observe(0.05)
+
+        self.assertEqual(posts.value(kind='single'), 4000)
+        self.assertEqual(latency.count(), 5)
+        text = registry.render()
+        self.assertIn('# TYPE posts_total counter\nposts_total{kind="single"} 4000\n', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1\n', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 5\n', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 5\n', text)
+        self.assertIn('latency_seconds_count 5\n', text)
+
+    def test_finished_threads_are_retired(self):
+        """Test that threads that have ended leave their values but not their dicts behind"""
+        registry = Registry()
+        posts = Counter('posts_total', 'Posts.', registry=registry)
+        for _ in range(200):
+            thread = threading.Thread(target=posts.inc)
+            thread.start()
+            thread.join()
+        posts.inc()
+
+        self.assertEqual(posts.value(), 201)
+        self.assertLessEqual(registry.shard_count(), 2)
+
+    def test_label_escaping(self):
+        """Test that label values cannot break the text format"""
+        registry = Registry()
+        Counter('odd_total', 'Odd labels.', ['path'], registry=registry).inc(path='a"b\\c\nd')
+        self.assertIn('odd_total{path="a\\"b\\\\c\\nd"} 1', registry.render())
+
+
+@override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+class MetricsEndpointTest(APITestCase):
+    def setUp(self):
+        # Throttle buckets and cached pages live in the cache
+        cache.clear()
+        self.user = User.objects.create_user(username='metered', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        TorrentFile.objects.create(name='movie night', uploader='metered', location='fopnu://file:/movie-night')
+
+    def delta(self, before, after, name, labels=''):
+        return after.get((name, labels), 0) - before.get((name, labels), 0)
+
+    def test_link_metrics(self):
+        """Test that created and rejected links are counted by source"""
+        before = scrape(self.client)
+        self.client.post(reverse('api_links'), {'location': 'fopnu://file:/one'})
+        self.client.post(reverse('api_links'), {'location': 'fopnu://file:/one'})
+        bulk = reverse('api_bulk_links')
+        self.client.post(bulk, {'links': ['fopnu://file:/two', 'fopnu://file:/three']}, format='json')
+        self.client.post(bulk, {'links': ['fopnu://file:/two', 'fopnu://file:/two']}, format='json')
+        after = scrape(self.client)
+
+        self.assertEqual(self.delta(before, after, 'nulinks_links_created_total', '{source="single"}'), 1)
+        self.assertEqual(self.delta(before, after, 'nulinks_links_created_total', '{source="bulk"}'), 2)
+        self.assertEqual(self.delta(before, after, 'nulinks_duplicates_rejected_total', '{source="api"}'), 1)
+        self.assertEqual(self.delta(before, after, 'nulinks_duplicates_rejected_total', '{source="bulk"}'), 2)
+        self.assertEqual(self.delta(
+            before, after, 'nulinks_http_request_duration_seconds_count',
+            '{view="api_bulk_links",method="POST",status="2xx"}',
+        ), 1)
+
+    def test_search_and_cache_metrics(self):
+        """Test that searches, their result sizes and listing cache hits and misses are counted"""
+        self.client.credentials()
+        before = scrape(self.client)
+        for _ in range(2):
+            self.client.get(reverse('search'), {'q': 'movie'})
+        after = scrape(self.client)
+
+        self.assertEqual(self.delta(before, after, 'nulinks_searches_total', '{terms="yes"}'), 1)
+        self.assertEqual(self.delta(before, after, 'nulinks_search_results_bucket', '{le="1.0"}'), 1)
+        lookups = 'nulinks_cache_requests_total'
+        self.assertEqual(self.delta(before, after, lookups, '{cache="listing",result="miss"}'), 1)
+        self.assertEqual(self.delta(before, after, lookups, '{cache="listing",result="hit"}'), 1)
+
+    def test_scrape_restricted(self):
+        """Test that /metrics answers allowed addresses or the configured bearer token, and nobody by default"""
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.7').status_code, 404)
+        self.client.credentials()
+        with override_settings(METRICS_ALLOWED_IPS=[]):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        with override_settings(METRICS_TOKEN='s3cret', METRICS_ALLOWED_IPS=[]):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+            response = self.client.get(
+                reverse('metrics'), REMOTE_ADDR='203.0.113.7', HTTP_AUTHORIZATION='Bearer s3cret'
+            )
+            self.assertEqual(response.status_code, 200)
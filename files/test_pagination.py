@@ -1,7 +1,13 @@
+import re
+from unittest import mock
+
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from files.models import TorrentFile, MtCategory
+from files.pagination import CountingPaginator, capped_count
 
 
 class PaginationTest(TestCase):
@@ -81,4 +87,38 @@ class PaginationTest(TestCase):
         self.assertIn('page_obj', response.context)
         
         # They should be the same object (page_obj)
-        self.assertEqual(response.context['tFiles'], response.context['page_obj'])
\ No newline at end of file
+        self.assertEqual(response.context['tFiles'], response.context['page_obj'])
+
+    def test_index_page_does_not_count_table(self):
+        """Test that the index runs no unbounded aggregate over the links; the total comes from the counters."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 50)
+        aggregates = [
+            q['sql'] for q in ctx.captured_queries
+            if '"files_torrentfile"' in q['sql'] and re.search(r'\b(COUNT|MAX|MIN|SUM|AVG)\(', q['sql'].upper())
+        ]
+        self.assertFalse([sql for sql in aggregates if 'LIMIT' not in sql.upper()], aggregates)
+
+    def test_counting_paginator_caps_filtered_count(self):
+        """Test that a filtered count stops at the cap and still pages."""
+        movies = TorrentFile.objects.filter(category=self.category).order_by('-id')
+        paginator = CountingPaginator(movies, 20, cap=30)
+        self.assertEqual(paginator.count, 30)
+        self.assertTrue(paginator.is_capped)
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertEqual(len(paginator.get_page(2)), 10)
+
+        paginator = CountingPaginator(movies, 20, cap=100)
+        self.assertEqual(paginator.count, 50)
+        self.assertFalse(paginator.is_capped)
+
+    def test_search_shows_capped_total(self):
+        """Test that a filtered listing reports its total, counting only up to the cap."""
+        response = self.client.get(reverse('search'), {'category': self.category.id})
+        self.assertEqual(len(response.context['tFiles']), 20)
+        self.assertContains(response, 'Found 50 results.')
+
+        with mock.patch('files.views.capped_count', lambda queryset: capped_count(queryset, cap=30)):
+            response = self.client.get(reverse('search'), {'category': self.category.id, 'q': 'movie'})
+        self.assertContains(response, 'Found 30+ results.')
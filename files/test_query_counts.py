@@ -0,0 +1,82 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from files.categories import category_registry
+from files.models import TorrentFile, MtCategory
+
+
+class ListingQueryCountTest(TestCase):
+    """
+    Every listing must cost a fixed number of queries, however many rows
+    it shows. Each check renders the listing with a few rows and with a
+    full page, and both runs must match the expected count.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.categories = [MtCategory.objects.create(name=f'Category {i}') for i in range(5)]
+        self.created = 0
+        # Categories come from the in-process registry once it is loaded
+        category_registry.all()
+
+        self.client = Client()
+        self.api_client = APIClient()
+        self.api_client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        # The API token is cached after its first use
+        self.api_client.get(reverse('api_categories'))
+
+    def add_files(self, count):
+        for _ in range(count):
+            self.created += 1
+            TorrentFile.objects.create(
+                name=f'Counted File {self.created}',
+                uploader='testuser',
+                location=f'fopnu://file:/counted-{self.created}.mkv',
+                category=self.categories[self.created % len(self.categories)],
+            )
+
+    def count_queries(self, client, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertFixedQueries(self, expected, client, url, params=None):
+        self.add_files(3)
+        small = self.count_queries(client, url, params)
+        self.add_files(40)
+        large = self.count_queries(client, url, params)
+        self.assertEqual(
+            (small, large), (expected, expected),
+            f'{url} ran {small} queries for 3 rows and {large} for a full page, expected {expected}'
+        )
+
+    def test_index(self):
+        # link counters total, page, category counts
+        self.assertFixedQueries(3, self.client, reverse('home'))
+
+    def test_search(self):
+        # page, category counts
+        self.assertFixedQueries(2, self.client, reverse('search'), {'q': 'counted', 'category': self.categories[1].id})
+
+    def test_profile(self):
+        # session, user, page
+        self.client.login(username='testuser', password='testpass123')
+        self.assertFixedQueries(3, self.client, reverse('profile'))
+
+    def test_api_links(self):
+        # validators, links
+        self.assertFixedQueries(2, self.api_client, reverse('api_links'))
+
+    def test_api_links_paginated(self):
+        # validators, page
+        self.assertFixedQueries(2, self.api_client, reverse('api_links'), {'page_size': 20})
+
+    def test_api_categories(self):
+        # nothing: token and categories are both cached
+        self.assertFixedQueries(0, self.api_client, reverse('api_categories'))
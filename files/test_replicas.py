@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TransactionTestCase, Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from files.categories import category_registry
+from files.models import TorrentFile, MtCategory
+from files.suggest import suggest_index
+from unchainedTorrent import routers
+
+
+class ReplicaRoutingTest(TransactionTestCase):
+    """
+    The test database is the primary and a second SQLite file stands in for
+    a replica that has not caught up: rows written to one are not in the other.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after the test case set up its database guards, which only know configured aliases
+        cls.directory = tempfile.mkdtemp()
+        connections.settings['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+        }
+        call_command('migrate', database='replica', verbosity=0)
+        cls.replica_settings = override_settings(DATABASE_REPLICAS=['replica'])
+        cls.replica_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.replica_settings.disable()
+        connections['replica'].close()
+        del connections.settings['replica']
+        del connections._connections.replica
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.category = MtCategory.objects.create(name='Movies')
+        # Rows that existed before the replica fell behind
+        User.objects.db_manager('replica').create_user(id=self.user.id, username='testuser')
+        MtCategory.objects.using('replica').create(id=self.category.id, name='Movies')
+        TorrentFile.objects.create(name='On Primary', uploader='testuser', location='fopnu://file:/primary')
+        TorrentFile(name='On Replica', uploader='testuser', location='fopnu://file:/replica').save(using='replica')
+        # Start each test like a fresh request
+        routers._state.pinned = False
+        self.client = Client()
+
+    def tearDown(self):
+        call_command('flush', database='replica', interactive=False, verbosity=0)
+
+    def test_listings_read_from_replica(self):
+        """Test that the home page and search are served from the replica"""
+        response = self.client.get(reverse('home'))
+        self.assertEqual([f.name for f in response.context['tFiles']], ['On Replica'])
+
+        response = self.client.get(reverse('search'), {'q': 'on'})
+        self.assertEqual([f.name for f in response.context['tFiles']], ['On Replica'])
+
+    def test_upload_redirect_reads_primary(self):
+        """Test that after an upload the profile shows the new link although the replica lacks it"""
+        self.assertTrue(self.client.login(username='testuser', password='testpass123'))
+        response = self.client.post(
+            reverse('upload'), {'location': 'fopnu://file:/new-upload.mkv', 'category': self.category.id}, follow=True
+        )
+        self.assertEqual(response.redirect_chain[-1][0], reverse('profile'))
+        self.assertIn('new-upload.mkv', [f.name for f in response.context['tFiles']])
+        self.assertIn(routers.PIN_COOKIE, self.client.cookies)
+        self.assertFalse(TorrentFile.objects.using('replica').filter(name='new-upload.mkv').exists())
+
+    def test_streamed_import_pins_client(self):
+        """Test that links written while an import streams are read back from the primary afterwards"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        response = client.generic(
+            'POST', reverse('api_import_links'), b'fopnu://file:/imported', content_type='text/plain'
+        )
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        b''.join(response.streaming_content)
+        self.assertFalse(routers.is_pinned())
+
+        response = client.get(reverse('api_links'))
+        self.assertIn('imported', [f['name'] for f in response.data['results']])
+
+    def test_writes_go_to_primary(self):
+        """Test that a write never lands on the replica, even from a replica-loaded row"""
+        torrent_file = TorrentFile.objects.get(name='On Replica')
+        self.assertEqual(torrent_file._state.db, 'replica')
+        routers._state.pinned = False
+        torrent_file.name = 'Copied'
+        torrent_file.save()
+        self.assertTrue(TorrentFile.objects.using('default').filter(name='Copied').exists())
+        self.assertEqual(TorrentFile.objects.using('replica').get(pk=torrent_file.pk).name, 'On Replica')
+
+    def test_replica_pages_not_kept_past_lag(self):
+        """Test that a page rendered from the replica gets no ETag and is cached only for the lag bound"""
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            response = self.client.get(reverse('home'))
+        self.assertEqual([f.name for f in response.context['tFiles']], ['On Replica'])
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(cache_set.call_args[0][2], settings.REPLICA_PIN_SECONDS)
+
+    def test_version_caches_filled_from_primary(self):
+        """Test that the category registry and suggest index never load from the replica"""
+        MtCategory.objects.create(name='Music')
+        self.assertEqual([c.name for c in category_registry.all()], ['Movies', 'Music'])
+        self.assertEqual([name for pk, name in suggest_index.suggest('on')], ['On Primary'])
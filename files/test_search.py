@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.urls import reverse
+from files.models import TorrentFile, MtCategory
+from files.search import get_search_backend, search_torrent_files, PostgresSearchBackend, SQLiteFTSBackend
+
+
+class FullTextSearchTest(TestCase):
+    def setUp(self):
+        """Set up a small catalog across two categories"""
+        self.client = Client()
+        self.movies = MtCategory.objects.create(name='Movies')
+        self.music = MtCategory.objects.create(name='Music')
+
+        self.brave = TorrentFile.objects.create(
+            name='Brave Story.mkv', uploader='user1',
+            location='fopnu://file:/Brave%20Story.mkv', category=self.movies
+        )
+        self.night = TorrentFile.objects.create(
+            name='Movie Night Movie Pack', uploader='user2',
+            location='fopnu://file:/movie-night', category=self.movies
+        )
+        self.song = TorrentFile.objects.create(
+            name='Brave Song.mp3', uploader='user1',
+            location='fopnu://file:/Brave%20Song.mp3', category=self.music
+        )
+
+    def search_names(self, **params):
+        response = self.client.get(reverse('search'), params)
+        self.assertEqual(response.status_code, 200)
+        return [f.name for f in response.context['tFiles']]
+
+    def test_backend_matches_database(self):
+        """Test that SQLite databases get the FTS5 backend"""
+        if connection.vendor == 'sqlite':
+            self.assertIsInstance(get_search_backend(), SQLiteFTSBackend)
+
+    def test_search_matches_words_and_prefixes(self):
+        """Test that whole words and word prefixes both match"""
+        self.assertEqual(sorted(self.search_names(q='brave')), ['Brave Song.mp3', 'Brave Story.mkv'])
+        self.assertEqual(self.search_names(q='sto'), ['Brave Story.mkv'])
+        self.assertEqual(self.search_names(q='brave mkv'), ['Brave Story.mkv'])
+        self.assertEqual(self.search_names(q='nothing'), [])
+
+    def test_search_with_category_filter(self):
+        """Test that the category filter still applies to full-text results"""
+        self.assertEqual(self.search_names(q='brave', category=self.music.id), ['Brave Song.mp3'])
+
+    def test_results_are_ranked(self):
+        """Test that every result carries a rank and the best match comes first"""
+        results = list(search_torrent_files(TorrentFile.objects.all(), 'movie').order_by('-search_rank'))
+        self.assertEqual(results, [self.night])
+        self.assertIsNotNone(results[0].search_rank)
+
+    def test_query_without_words_falls_back(self):
+        """Test that punctuation-only queries still run as a substring search"""
+        self.assertEqual(sorted(self.search_names(q='.')), ['Brave Song.mp3', 'Brave Story.mkv'])
+
+    def test_index_follows_save_and_delete(self):
+        """Test that renames and deletes are reflected immediately"""
+        self.brave.name = 'Courage Tale.mkv'
+        self.brave.save()
+        self.assertEqual(self.search_names(q='courage'), ['Courage Tale.mkv'])
+        self.assertEqual(self.search_names(q='story'), [])
+
+        self.song.delete()
+        self.assertEqual(self.search_names(q='brave'), [])
+
+    def test_rebuild_command(self):
+        """Test that the management command rebuilds the index"""
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Rebuilt search index', out.getvalue())
+        self.assertEqual(self.search_names(q='night'), ['Movie Night Movie Pack'])
+
+    def test_postgres_filter_matches_index_expression(self):
+        """Test that the PostgreSQL match is built on the indexed expression, with the query as a parameter"""
+        queryset = PostgresSearchBackend().search(TorrentFile.objects.all(), 'brave so')
+        sql, params = queryset.query.sql_with_params()
+        self.assertIn("WHERE (%s @@ to_tsquery('simple', %%s))" % PostgresSearchBackend.VECTOR, sql)
+        self.assertIn('brave:* & so:*', params)
@@ -1,6 +1,12 @@
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase, Client
 from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
 from files.models import TorrentFile, MtCategory
+from files.pagination import KeysetPaginator
+from files.sorting import sort_ordering
 from django.utils import timezone
 from datetime import timedelta
 
@@ -49,16 +55,15 @@ class SortingPersistenceTest(TestCase):
         self.assertContains(response, 'Alpha File')
         self.assertContains(response, 'Beta File')
 
-    def test_sorting_javascript_included(self):
-        """Test that the sorting JavaScript is included in the page"""
+    def test_headers_link_to_server_side_sort(self):
+        """Test that the column headers sort through the server, not in the browser"""
         response = self.client.get(reverse('home'))
         self.assertEqual(response.status_code, 200)
-        
-        # Check for sorting functionality
-        self.assertContains(response, 'nulinks_table_sort')
-        self.assertContains(response, 'localStorage')
-        self.assertContains(response, 'sortTable')
-        self.assertContains(response, 'updateSortIndicator')
+        self.assertContains(response, 'href="?sort=name"')
+        self.assertContains(response, 'href="?sort=category"')
+        self.assertContains(response, 'href="?sort=uploader"')
+        self.assertContains(response, 'href="?sort=uploadTime"')
+        self.assertNotContains(response, 'localStorage')
 
     def test_table_structure(self):
         """Test that the table has the correct structure for sorting"""
@@ -87,12 +92,128 @@ class SortingPersistenceTest(TestCase):
         
         self.assertTrue(beta_pos < alpha_pos < zebra_pos)
 
-    def test_css_styles_included(self):
-        """Test that the sorting CSS styles are included"""
-        response = self.client.get(reverse('home'))
+    def order_of(self, content, *names):
+        return sorted(names, key=content.find)
+
+    def test_sort_by_name(self):
+        """Test that ?sort=name orders every link by name, and -name reverses it"""
+        response = self.client.get(reverse('home'), {'sort': 'name'})
+        content = response.content.decode()
+        self.assertEqual(self.order_of(content, 'Zebra File', 'Alpha File', 'Beta File'),
+                         ['Alpha File', 'Beta File', 'Zebra File'])
+        self.assertContains(response, 'class="sort-asc"')
+        # Clicking the sorted column again reverses it
+        self.assertContains(response, 'href="?sort=-name"')
+
+        response = self.client.get(reverse('home'), {'sort': '-name'})
+        content = response.content.decode()
+        self.assertEqual(self.order_of(content, 'Zebra File', 'Alpha File', 'Beta File'),
+                         ['Zebra File', 'Beta File', 'Alpha File'])
+        self.assertContains(response, 'class="sort-desc"')
+
+    def test_sort_by_upload_time_and_uploader(self):
+        """Test that the other columns sort on the server too"""
+        content = self.client.get(reverse('home'), {'sort': 'uploadTime'}).content.decode()
+        self.assertEqual(self.order_of(content, 'Zebra File', 'Alpha File', 'Beta File'),
+                         ['Zebra File', 'Alpha File', 'Beta File'])
+        content = self.client.get(reverse('home'), {'sort': '-uploader'}).content.decode()
+        self.assertEqual(self.order_of(content, 'Zebra File', 'Alpha File', 'Beta File'),
+                         ['Beta File', 'Alpha File', 'Zebra File'])
+
+    def test_invalid_sort_falls_back_to_newest_first(self):
+        """Test that an unknown sort value shows the default order"""
+        response = self.client.get(reverse('home'), {'sort': 'location'})
         self.assertEqual(response.status_code, 200)
-        
-        # Check for sorting-related CSS
-        self.assertContains(response, 'cursor: pointer')
-        self.assertContains(response, 'sort-indicator')
-        self.assertContains(response, 'sort-asc, .sort-desc')
\ No newline at end of file
+        content = response.content.decode()
+        self.assertEqual(self.order_of(content, 'Zebra File', 'Alpha File', 'Beta File'),
+                         ['Beta File', 'Alpha File', 'Zebra File'])
+
+    def test_search_keeps_sort(self):
+        """Test that search results can be sorted and the form carries the sort along"""
+        response = self.client.get(reverse('search'), {'q': 'file', 'sort': 'name'})
+        content = response.content.decode()
+        self.assertEqual(self.order_of(content, 'Zebra File', 'Alpha File', 'Beta File'),
+                         ['Alpha File', 'Beta File', 'Zebra File'])
+        self.assertContains(response, '<input type="hidden" name="sort" value="name">')
+        self.assertContains(response, 'href="?q=file&amp;sort=-name"')
+
+
+class SortedPagingTest(TestCase):
+    def setUp(self):
+        """Create 45 files in two categories and none, with names out of upload order"""
+        self.user = User.objects.create_user(username='sorter', password='testpass123')
+        categories = [MtCategory.objects.create(name='Movies'), MtCategory.objects.create(name='Music'), None]
+        base_time = timezone.now()
+        for i in range(45):
+            TorrentFile.objects.create(
+                name='Sorted File %02d' % ((i * 7) % 45),
+                uploader='sorter',
+                location='fopnu://file:/sorted-%d.mkv' % i,
+                category=categories[i % 3],
+            )
+        for torrent_file in TorrentFile.objects.all():
+            TorrentFile.objects.filter(pk=torrent_file.pk).update(
+                uploadTime=base_time - timedelta(minutes=torrent_file.pk // 2)
+            )
+        self.client = Client()
+
+    def walk(self, sort):
+        """Names on every keyset page of the index in ``sort`` order."""
+        paginator = KeysetPaginator(TorrentFile.objects.listing(), 20, sort_ordering(sort))
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        back = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[1]))
+        return [obj for page in pages for obj in page]
+
+    def test_keyset_pages_follow_every_sort(self):
+        """Test that cursors visit every row once in each sort order, NULL categories included"""
+        for sort in ('name', '-name', 'uploadTime', '-uploadTime', 'uploader', '-uploader', 'category', '-category'):
+            with self.subTest(sort=sort):
+                expected = list(TorrentFile.objects.order_by(*sort_ordering(sort)))
+                self.assertEqual(self.walk(sort), expected)
+
+    def test_index_cursor_keeps_sort(self):
+        """Test that the index's cursor links page on in the chosen order"""
+        response = self.client.get(reverse('home'), {'sort': 'name', 'cursor': ''})
+        page = response.context['page_obj']
+        self.assertEqual([obj.name for obj in page], ['Sorted File %02d' % i for i in range(20)])
+        self.assertContains(response, 'Next')
+
+        response = self.client.get(reverse('home'), {'sort': 'name', 'cursor': page.next_cursor})
+        self.assertEqual([obj.name for obj in response.context['page_obj']],
+                         ['Sorted File %02d' % i for i in range(20, 40)])
+
+    def test_each_sort_reads_an_index(self):
+        """Test that no sort order needs a sort step in the query plan"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Reads SQLite query plans')
+        for sort in ('name', '-name', 'uploadTime', '-uploadTime', 'uploader', '-uploader', 'category', '-category'):
+            with self.subTest(sort=sort):
+                queryset = TorrentFile.objects.listing().order_by(*sort_ordering(sort))[:21]
+                sql, params = queryset.query.sql_with_params()
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                    plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+                self.assertNotIn('TEMP B-TREE', plan)
+                self.assertIn('USING INDEX', plan)
+
+    def test_api_sort(self):
+        """Test that the API sorts with ?sort= and rejects unknown values"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        url = reverse('api_links')
+
+        response = client.get(url, {'sort': '-name', 'fields': 'id'})
+        self.assertEqual(response.status_code, 200)
+        expected = list(TorrentFile.objects.order_by('-name', '-id').values_list('id', flat=True))
+        ids = [link['id'] for link in response.data['results']]
+        self.assertEqual(ids, expected[:20])
+        response = client.get(response.data['next'])
+        self.assertEqual([link['id'] for link in response.data['results']], expected[20:40])
+
+        response = client.get(url, {'sort': 'location'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sort', response.data)
@@ -0,0 +1,103 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from files.counters import category_counts
+from files.models import TorrentFile, MtCategory, LinkSubmission
+from files import submissions as worker
+from files.submissions import process_batch, reclaim_stale
+
+
+class LinkSubmissionTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='queuer', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        self.category = MtCategory.objects.create(name='movies')
+        TorrentFile.objects.create(
+            name='old', location='fopnu://file:/old.mkv', uploader='queuer', category=self.category
+        )
+
+    def queue(self, url, data):
+        response = self.client.post(url + '?async=1', data, format='json')
+        self.assertEqual(response.status_code, 202)
+        return response
+
+    def test_bulk_links_are_queued_then_imported(self):
+        """Test that an async bulk post writes no links until the worker runs, then reports each one"""
+        response = self.queue(reverse('api_bulk_links'), {
+            'links': ['fopnu://file:/new.mkv', 'fopnu://file:/old.mkv', 'fopnu://file:/new.mkv'],
+            'category_id': self.category.id,
+        })
+        status_url = reverse('api_link_submission', args=[response.data['job_id']])
+        self.assertEqual(response['Location'], status_url)
+        self.assertTrue(response.data['status_url'].endswith(status_url))
+        self.assertEqual(TorrentFile.objects.count(), 1)
+        self.assertEqual(self.client.get(status_url).data['status'], 'pending')
+
+        out = StringIO()
+        call_command('process_link_submissions', '--once', stdout=out)
+        self.assertIn('processed 1 jobs', out.getvalue())
+
+        data = self.client.get(status_url).data
+        self.assertEqual(data['status'], 'done')
+        self.assertEqual(data['summary'], {'created': 1, 'duplicate': 2})
+        self.assertEqual([result['index'] for result in data['results']], [1, 2, 3])
+        created = TorrentFile.objects.get(id=data['results'][0]['id'])
+        self.assertEqual(created.uploader_user, self.user)
+        self.assertEqual(created.category, self.category)
+        self.assertEqual(category_counts(), {self.category.id: 2})
+
+    def test_single_links_share_a_transaction(self):
+        """Test that several queued posts are imported in one batch"""
+        for number in range(3):
+            self.queue(reverse('api_links'), {'location': f'fopnu://file:/queued-{number}.mkv'})
+        with mock.patch.object(worker, 'save_submissions', wraps=worker.save_submissions) as save:
+            submissions = process_batch('test-worker', 10)
+        self.assertEqual(len(submissions), 3)
+        save.assert_called_once_with(submissions)
+        self.assertEqual(TorrentFile.objects.filter(uploader_user=self.user).count(), 4)
+        self.assertEqual(process_batch('test-worker', 10), [])
+
+    def test_failing_job_does_not_fail_the_batch(self):
+        """Test that a job that raises is marked failed while the rest of its batch is imported"""
+        self.queue(reverse('api_links'), {'location': 'fopnu://file:/fine.mkv'})
+        broken = LinkSubmission.objects.create(user=self.user, links=5)
+        process_batch('test-worker', 10)
+        self.assertEqual(
+            dict(LinkSubmission.objects.values_list('id', 'status')),
+            {broken.id - 1: 'done', broken.id: 'failed'},
+        )
+        self.assertTrue(TorrentFile.objects.filter(location='fopnu://file:/fine.mkv').exists())
+
+    def test_stalled_jobs_are_requeued(self):
+        """Test that a job left processing by a vanished worker goes back in the queue"""
+        self.queue(reverse('api_links'), {'location': 'fopnu://file:/stalled.mkv'})
+        LinkSubmission.objects.update(status=LinkSubmission.PROCESSING, claimed_by='gone')
+        self.assertEqual(reclaim_stale(60), 0)
+        self.assertEqual(reclaim_stale(-1), 1)
+        self.assertEqual(LinkSubmission.objects.get().status, LinkSubmission.PENDING)
+
+    def test_invalid_posts_are_refused_up_front(self):
+        """Test that badly shaped async posts get 400 and queue nothing"""
+        response = self.client.post(reverse('api_links') + '?async=1', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('location', response.data)
+        response = self.client.post(reverse('api_bulk_links') + '?async=1', {
+            'links': ['fopnu://file:/a.mkv'], 'category_id': 9999,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('category_id', response.data)
+        self.assertFalse(LinkSubmission.objects.exists())
+
+    def test_status_is_private(self):
+        """Test that only the submitter can see a job"""
+        response = self.queue(reverse('api_links'), {'location': 'fopnu://file:/mine.mkv'})
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=other).key)
+        status_url = reverse('api_link_submission', args=[response.data['job_id']])
+        self.assertEqual(self.client.get(status_url).status_code, 404)
@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from files.models import TorrentFile, MtCategory
+from files.signals import links_bulk_created
+from files.suggest import suggest_categories, suggest_index
+
+
+def create_link(name, minutes_ago, category=None):
+    link = TorrentFile.objects.create(
+        name=name, uploader='suggester', location='fopnu://file:/suggest/%s' % name, category=category,
+    )
+    TorrentFile.objects.filter(pk=link.pk).update(uploadTime=timezone.now() - timedelta(minutes=minutes_ago))
+    link.refresh_from_db()
+    return link
+
+
+def names(query, limit=10):
+    return [name for pk, name in suggest_index.suggest(query, limit)]
+
+
+class SuggestIndexTest(TestCase):
+    def setUp(self):
+        # The index's change counters live in the cache
+        cache.clear()
+        self.movies = MtCategory.objects.create(name='Movies')
+        self.music = MtCategory.objects.create(name='Music Videos')
+        create_link('Night Live.mkv', 30)
+        create_link('Nightly Build.zip', 20)
+        create_link('Winter Night.flac', 10)
+        create_link('Ocean Signal.mp4', 5)
+
+    def test_prefix_newest_first(self):
+        """Test that every link with a word starting with the prefix comes back, newest first"""
+        self.assertEqual(names('nig'), ['Winter Night.flac', 'Nightly Build.zip', 'Night Live.mkv'])
+        self.assertEqual(names('NIGHT', limit=2), ['Winter Night.flac', 'Nightly Build.zip'])
+        self.assertEqual(names('xyz'), [])
+        self.assertEqual(names('  '), [])
+
+    def test_every_word_must_match(self):
+        """Test that each word of the query must start a word of the name"""
+        self.assertEqual(names('night li'), ['Night Live.mkv'])
+        self.assertEqual(names('win nig'), ['Winter Night.flac'])
+        self.assertEqual(names('ight'), [])
+
+    def test_no_queries_once_current(self):
+        """Test that suggestions are served from memory while nothing has changed"""
+        names('night')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(names('o')), 1)
+
+    def test_follows_changes(self):
+        """Test that created, bulk created, renamed and deleted links are picked up"""
+        names('night')
+        newest = create_link('Night Owl.mkv', 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(names('night')[0], 'Night Owl.mkv')
+
+        bulk = TorrentFile.objects.bulk_create([
+            TorrentFile(name='Nighthawk.iso', uploader='suggester', location='fopnu://file:/suggest/hawk'),
+        ])
+        links_bulk_created.send(sender=TorrentFile, files=bulk)
+        self.assertEqual(names('nighth'), ['Nighthawk.iso'])
+
+        newest.name = 'Day Owl.mkv'
+        newest.save()
+        self.assertEqual(names('owl'), ['Day Owl.mkv'])
+        TorrentFile.objects.get(name='Ocean Signal.mp4').delete()
+        self.assertEqual(names('ocean'), [])
+
+    def test_other_edits_keep_index(self):
+        """Test that edits leaving the name alone do not make the index rebuild"""
+        names('night')
+        link = TorrentFile.objects.get(name='Night Live.mkv')
+        link.category = self.movies
+        link.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(names('night')), 3)
+
+    def test_memory_is_bounded(self):
+        """Test that only the most recent links are kept once the index is full"""
+        with override_settings(SUGGEST_MAX_LINKS=3):
+            suggest_index.changed()
+            self.assertEqual(names('night'), ['Winter Night.flac', 'Nightly Build.zip'])
+            create_link('Night Train.mkv', 0)
+            self.assertEqual(names('night'), ['Night Train.mkv', 'Winter Night.flac'])
+            self.assertEqual(len(suggest_index), 3)
+        suggest_index.changed()
+
+    def test_categories(self):
+        """Test that categories match on the start of any word of their name"""
+        self.assertEqual(suggest_categories('mu'), [self.music])
+        self.assertEqual(suggest_categories('vid'), [self.music])
+        self.assertEqual(suggest_categories('m'), [self.movies, self.music])
+
+    def test_endpoint(self):
+        """Test that /api/suggest/ answers anonymous requests with links and categories"""
+        response = self.client.get(reverse('api_suggest'), {'q': 'mo', 'limit': 'x'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'query': 'mo',
+            'links': [],
+            'categories': [{'id': self.movies.id, 'name': 'Movies'}],
+        })
+        response = self.client.get(reverse('api_suggest'), {'q': 'night', 'limit': 1})
+        self.assertEqual([link['name'] for link in response.json()['links']], ['Winter Night.flac'])
+        self.assertIn('X-RateLimit-Remaining', response)
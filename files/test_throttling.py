@@ -0,0 +1,110 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+RATES = {
+    'link_post': '3/min',
+    'link_post_ip': '5/min',
+    'link_bulk': '1/min',
+    'link_bulk_ip': '5/min',
+}
+
+
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': RATES})
+class PostingThrottleTest(APITestCase):
+    def setUp(self):
+        self.clock = 1_000_000.0
+        patcher = mock.patch('files.throttling.time.time', lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.posted = 0
+        self.use_token('bot1')
+
+    def use_token(self, username):
+        user = User.objects.create_user(username=username, password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+
+    def post_link(self, **extra):
+        self.posted += 1
+        return self.client.post(
+            reverse('api_links'), {'location': f'fopnu://file:/throttled-{self.posted}'}, **extra
+        )
+
+    def test_token_bucket_refills(self):
+        """Test that a token gets its burst, is refused with Retry-After, and refills over time"""
+        remaining = [self.post_link()['X-RateLimit-Remaining'] for _ in range(3)]
+        self.assertEqual(remaining, ['2', '1', '0'])
+
+        response = self.post_link()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '20')
+        self.assertEqual(response['X-RateLimit-Limit'], '3')
+
+        self.clock += 20
+        self.assertEqual(self.post_link().status_code, 201)
+        self.assertEqual(self.post_link().status_code, 429)
+
+        self.clock += 60
+        self.assertEqual(self.post_link()['X-RateLimit-Remaining'], '2')
+
+    def test_refused_requests_do_not_drain_bucket(self):
+        """Test that hammering a full bucket does not push the next allowed request further away"""
+        for _ in range(3):
+            self.post_link()
+        for _ in range(10):
+            self.assertEqual(self.post_link().status_code, 429)
+        self.clock += 20
+        self.assertEqual(self.post_link().status_code, 201)
+
+    def test_ip_bucket_shared_across_tokens(self):
+        """Test that one client address cannot dodge its limit by rotating tokens"""
+        for _ in range(3):
+            self.assertEqual(self.post_link().status_code, 201)
+        self.use_token('bot2')
+        for _ in range(2):
+            self.assertEqual(self.post_link().status_code, 201)
+        response = self.post_link()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['X-RateLimit-Limit'], '5')
+
+    def test_refused_by_ip_does_not_drain_token(self):
+        """Test that a request the IP bucket refuses is not charged to the token bucket"""
+        for _ in range(3):
+            self.post_link()
+        self.use_token('bot2')
+        for _ in range(2):
+            self.assertEqual(self.post_link().status_code, 201)
+        for _ in range(5):
+            self.assertEqual(self.post_link().status_code, 429)
+        # One request back in the IP bucket, and bot2 still has its last one
+        self.clock += 12
+        self.assertEqual(self.post_link().status_code, 201)
+
+    def test_forwarded_for_is_not_trusted(self):
+        """Test that a client cannot pick its IP bucket with a made-up X-Forwarded-For"""
+        for n in range(3):
+            self.assertEqual(self.post_link(HTTP_X_FORWARDED_FOR=f'10.0.0.{n}').status_code, 201)
+        self.use_token('bot2')
+        for n in range(3, 5):
+            self.assertEqual(self.post_link(HTTP_X_FORWARDED_FOR=f'10.0.0.{n}').status_code, 201)
+        self.assertEqual(self.post_link(HTTP_X_FORWARDED_FOR='10.0.0.9').status_code, 429)
+
+    def test_bulk_has_its_own_quota(self):
+        """Test that bulk posting is limited separately from single posts, and listing is not limited"""
+        for _ in range(3):
+            self.post_link()
+        bulk = reverse('api_bulk_links')
+        response = self.client.post(bulk, {'links': ['fopnu://file:/bulk-1']}, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(bulk, {'links': ['fopnu://file:/bulk-2']}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+
+        response = self.client.get(reverse('api_links'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('X-RateLimit-Remaining'))
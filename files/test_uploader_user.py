@@ -0,0 +1,101 @@
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+
+from django.apps import apps
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from files.models import TorrentFile
+
+link_uploader_users = import_module('files.migrations.0012_link_uploader_user').link_uploader_users
+
+
+class UploaderUserTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.client = Client()
+
+    def create_legacy(self, uploader, count=1):
+        """Rows as they were before uploader_user existed"""
+        files = [
+            TorrentFile.objects.create(name=f'{uploader} {i}', uploader=uploader, location=f'fopnu://file:/{uploader}-{i}')
+            for i in range(count)
+        ]
+        TorrentFile.objects.filter(pk__in=[f.pk for f in files]).update(uploader_user=None)
+        return files
+
+    def backfill(self, *args):
+        out = StringIO()
+        call_command('backfill_uploader_user', *args, stdout=out)
+        return out.getvalue()
+
+    def test_save_links_uploader(self):
+        """Test that a new link is tied to the user named as uploader"""
+        torrent_file = TorrentFile.objects.create(name='New', uploader='alice', location='fopnu://file:/new')
+        self.assertEqual(torrent_file.uploader_user, self.alice)
+
+    def test_backfill_links_matching_users(self):
+        """Test that the backfill links every row whose uploader exists and leaves the rest"""
+        self.create_legacy('alice', 3)
+        self.create_legacy('bob', 2)
+        self.create_legacy('ghost')
+
+        output = self.backfill('--batch-size', '2')
+
+        self.assertIn('Linked 5 links', output)
+        self.assertEqual(self.alice.torrent_files.count(), 3)
+        self.assertEqual(self.bob.torrent_files.count(), 2)
+        self.assertEqual(TorrentFile.objects.filter(uploader_user__isnull=True).count(), 1)
+
+    def test_backfill_resumes(self):
+        """Test that a second run only touches rows past --start-id and rows still unlinked"""
+        first, second = self.create_legacy('alice', 2)
+        self.backfill('--start-id', str(first.pk))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertIsNone(first.uploader_user)
+        self.assertEqual(second.uploader_user, self.alice)
+
+        self.assertIn('Linked 1 links', self.backfill())
+        first.refresh_from_db()
+        self.assertEqual(first.uploader_user, self.alice)
+
+    def test_edit_checks_owner_by_key(self):
+        """Test that editing is allowed by the linked user, not by the uploader string"""
+        torrent_file = TorrentFile.objects.create(name='Owned', uploader='alice', location='fopnu://file:/owned')
+        url = reverse('edit_torrent_file', kwargs={'file_id': torrent_file.id})
+
+        self.client.login(username='bob', password='testpass123')
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.login(username='alice', password='testpass123')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_migration_links_remaining_rows(self):
+        """Test that migration 0012 links the rows the backfill has not reached, for the profile, API and editing"""
+        legacy, = self.create_legacy('alice')
+        ghost, = self.create_legacy('ghost')
+        link_uploader_users(apps, SimpleNamespace(connection=connection))
+        ghost.refresh_from_db()
+        self.assertIsNone(ghost.uploader_user)
+
+        self.client.login(username='alice', password='testpass123')
+        self.assertEqual(list(self.client.get(reverse('profile')).context['tFiles']), [legacy])
+        url = reverse('edit_torrent_file', kwargs={'file_id': legacy.id})
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        api_client = APIClient()
+        api_client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.alice).key)
+        response = api_client.get(reverse('api_links'))
+        self.assertEqual([f['id'] for f in response.data['results']], [legacy.id])
+
+        self.client.login(username='bob', password='testpass123')
+        self.assertEqual(list(self.client.get(reverse('profile')).context['tFiles']), [])
+        self.assertEqual(self.client.get(url).status_code, 404)
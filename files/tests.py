@@ -9,6 +9,8 @@ from django.test import TestCase, Client
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from unittest import mock
 import django
 from packaging import version
 from files.models import TorrentFile, MtCategory
@@ -189,6 +191,37 @@ class DuplicateLinkDetectionTest(TestCase):
             file_exists = TorrentFile.objects.filter(location=link).exists()
             self.assertTrue(file_exists)
 
+    def test_find_duplicate_uses_normalized_location(self):
+        """Test that whitespace, escaping and scheme case do not hide a duplicate."""
+        for variant in ('  fopnu://file:/test-movie.mkv ', 'FOPNU://file:/test-movie.mkv',
+                        'fopnu://file:/test%2Dmovie.mkv'):
+            self.assertEqual(TorrentFile.find_duplicate(variant), self.torrent_file1)
+
+    def test_database_rejects_duplicate_location(self):
+        """Test that the unique index rejects a duplicate that skipped validation."""
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                TorrentFile.objects.create(
+                    name='Racing Copy', uploader='testuser2', location=' ' + self.existing_link
+                )
+
+    def test_web_interface_duplicate_race(self):
+        """Test that a duplicate inserted after validation is reported, not a server error."""
+        self.client.login(username='testuser2', password='testpass123')
+        new_link = 'fopnu://file:/raced-file.mkv'
+
+        real_clean_location = TorrentFileForm.clean_location
+        def clean_then_lose_race(form):
+            location = real_clean_location(form)
+            TorrentFile.objects.create(name='Winner', uploader='testuser1', location=new_link)
+            return location
+
+        with mock.patch.object(TorrentFileForm, 'clean_location', clean_then_lose_race):
+            response = self.client.post(reverse('upload'), {'location': new_link})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'This link has already been posted')
+        self.assertEqual(TorrentFile.objects.filter(location=new_link).count(), 1)
+
     def test_duplicate_detection_error_message_format(self):
         """Test that duplicate detection error messages contain useful information."""
         form_data = {
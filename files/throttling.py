@@ -0,0 +1,174 @@
+"""
+Token-bucket throttles for the API posting endpoints.
+
+Each bucket holds ``num`` requests and refills at ``num`` per ``period``,
+with rates taken from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] by scope.
+The bucket is stored as a single "theoretical arrival time" in milliseconds
+(GCRA), so taking a request is one atomic cache.incr() rather than a
+read-modify-write that concurrent workers could race on. Buckets live in
+the settings.THROTTLE_CACHE_ALIAS cache, which the test runner empties
+before every test.
+
+RateLimitHeadersMiddleware reports a request's quota in X-RateLimit-Limit /
+X-RateLimit-Remaining; throttled requests also get Retry-After from DRF.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'60/min' -> (60, 60): requests allowed and the period in seconds."""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def get_cache_key(self, request, view):
+        """Bucket key for ``request``, or None to leave it unthrottled."""
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def get_rate(self):
+        try:
+            return parse_rate(api_settings.DEFAULT_THROTTLE_RATES[self.scope])
+        except KeyError:
+            raise ImproperlyConfigured('No throttle rate set for scope "%s"' % self.scope)
+
+    def allow_request(self, request, view):
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        num, period = self.get_rate()
+        interval = period * 1000 // num
+        burst = num * interval
+        timeout = period + 1
+        now = int(time.time() * 1000)
+
+        self.cache.add(key, now, timeout)
+        try:
+            arrival = self.cache.incr(key, interval)
+        except ValueError:
+            # Expired between add() and incr()
+            arrival = now + interval
+            self.cache.set(key, arrival, timeout)
+        if arrival - interval < now:
+            # The bucket had refilled completely; count from now
+            arrival = now + interval
+            self.cache.set(key, arrival, timeout)
+        else:
+            self.cache.touch(key, timeout)
+
+        allowed = arrival <= now + burst
+        charges = getattr(request._request, 'throttle_charges', [])
+        if not allowed or self.refused(request):
+            # A refused request takes nothing from this bucket...
+            self.cache.decr(key, interval)
+            arrival -= interval
+        else:
+            charges.append((self.cache, key, interval))
+        if not allowed:
+            # ...nor from those that already let it through
+            for cache, charged_key, charged_interval in charges:
+                self.refund(cache, charged_key, charged_interval)
+            charges = []
+        request._request.throttle_charges = charges
+        self.remaining = max(0, (now + burst - arrival) // interval)
+        self.wait_seconds = 0 if allowed else (arrival + interval - now - burst) / 1000
+        self.record(request, num, allowed)
+        return allowed
+
+    @staticmethod
+    def refused(request):
+        """Whether another bucket has already refused ``request``; DRF still asks every throttle."""
+        return any(not allowed for allowed, remaining, num in getattr(request._request, 'rate_limits', []))
+
+    @staticmethod
+    def refund(cache, key, interval):
+        try:
+            cache.decr(key, interval)
+        except ValueError:
+            # Expired meanwhile, so the bucket is full anyway
+            pass
+
+    def record(self, request, num, allowed):
+        limits = getattr(request._request, 'rate_limits', [])
+        limits.append((allowed, self.remaining, num))
+        request._request.rate_limits = limits
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class PostingThrottle(TokenBucketThrottle):
+    """Only POST requests draw from the bucket."""
+
+    def allow_request(self, request, view):
+        if request.method != 'POST':
+            return True
+        return super().allow_request(request, view)
+
+
+class TokenPostingThrottle(PostingThrottle):
+    def get_cache_key(self, request, view):
+        if request.auth is None:
+            return None
+        ident = getattr(request.auth, 'key', request.user.pk)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class IPPostingThrottle(PostingThrottle):
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LinkPostTokenThrottle(TokenPostingThrottle):
+    scope = 'link_post'
+
+
+class LinkPostIPThrottle(IPPostingThrottle):
+    scope = 'link_post_ip'
+
+
+class BulkPostTokenThrottle(TokenPostingThrottle):
+    scope = 'link_bulk'
+
+
+class BulkPostIPThrottle(IPPostingThrottle):
+    scope = 'link_bulk_ip'
+
+
+class SuggestIPThrottle(TokenBucketThrottle):
+    scope = 'suggest_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class RateLimitHeadersMiddleware:
+    """Adds the quota left in the bucket that refused the request, or else the tightest one."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        limits = getattr(request, 'rate_limits', None)
+        if limits:
+            allowed, remaining, limit = min(limits)
+            response['X-RateLimit-Limit'] = str(limit)
+            response['X-RateLimit-Remaining'] = str(remaining)
+        return response
@@ -1,31 +1,58 @@
-from urllib.parse import unquote
-
 from django.conf import settings
 from django.contrib.auth import views
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.core.exceptions import ValidationError
 from django.core.files.storage import FileSystemStorage
-from django.core.paginator import Paginator
 from django.http import HttpResponse, Http404
 from django.shortcuts import redirect, render, get_object_or_404
 
+from files.cache import cache_anonymous_listing
+from files.categories import category_registry
+from files.conditional import conditional_listing
+from files.counters import category_facets, total_links
 from files.forms import TorrentFileForm, TorrentFileEditForm
+from files.linkparse import parse_link
+from files.metrics import search_results, searches
 from files.models import TorrentFile, MtCategory
+from files.pagination import CountingPaginator, KeysetPaginator, capped_count, query_string_without
+from files.search import search_torrent_files
+from files.sorting import pagination_labels, requested_sort, sort_headers
 
 
+@cache_anonymous_listing
+@conditional_listing()
 def index(request):
-    torrent_files = TorrentFile.objects.all().order_by("-uploadTime")
-    categories = MtCategory.objects.all().order_by('name')
-    
-    # Add pagination
-    paginator = Paginator(torrent_files, 20)  # Show 20 files per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    sort, ordering = requested_sort(request)
+    torrent_files = TorrentFile.objects.listing().order_by(*ordering)
+    categories = category_registry.all()
     
+    # Add pagination: numbered pages by default, keyset pages once a cursor is given
+    keyset = KeysetPaginator(torrent_files, 20, ordering)
+    cursor = request.GET.get('cursor')
+    older_cursor = None
+    if cursor is not None:
+        page_obj = keyset.get_page(cursor)
+    else:
+        # Show 20 files per page; the total comes from the link counters, not COUNT(*)
+        paginator = CountingPaginator(torrent_files, 20, total=total_links)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
+        # Deep browsing can continue by cursor from the last row of this page
+        if page_obj.has_next():
+            older_cursor = keyset.encode_cursor(page_obj[-1])
+
     return render(request, "index.html", {
         "tFiles": page_obj,
         "categories": categories,
+        "category_facets": category_facets(categories),
         "page_obj": page_obj,
+        "keyset": cursor is not None,
+        "older_cursor": older_cursor,
+        "cursor_query": query_string_without(request, 'cursor', 'page'),
+        "sort_headers": sort_headers(request, sort),
+        "pagination_labels": pagination_labels(sort),
     })
 
 
@@ -43,32 +70,22 @@ def get_name(request):
 
             # name of the uploader
             torrentForm.uploader = request.user.username
-
-            # address of the link
-            url_location = request.POST.get("location")
-
-            if url_location:
-                name = None
-                if "fopnu" in url_location:
-                    words = ["chat:", "file:", "user:"]
-                    if any(word in url_location for word in words):
-                        url_location_parsed = unquote(url_location)
-                        name = url_location_parsed.split("/")[-1]
-                    # elif "file:" in url_location:
-                    #     url_location_parsed = unquote(url_location)
-                    #     name = url_location_parsed.split("/")[-1]
-                    # elif "user:" in url_location:
-                    #     url_location_parsed = unquote(url_location)
-                    #     name = url_location_parsed.split("/")[-1]
-            else:
-                torrentForm.name = "default_value"
-
-            if name:
-                torrentForm.name = name
-            else:
-                torrentForm.name = url_location
-
-            torrentForm.save()
+            torrentForm.uploader_user = request.user
+
+            # name shown for the link
+            torrentForm.name = parse_link(request.POST.get("location")).name
+
+            try:
+                with transaction.atomic():
+                    torrentForm.save()
+            except IntegrityError:
+                # Another upload of the same link won the race since clean_location() ran
+                try:
+                    fileUploadForm.clean_location()
+                except ValidationError as error:
+                    fileUploadForm.add_error("location", error)
+                    return render(request, "torrentFileUpload.html", {"form": fileUploadForm})
+                raise
             # return HttpResponse("form is valid")
             return redirect("profile")
         else:
@@ -79,39 +96,65 @@ def get_name(request):
     return render(request, "torrentFileUpload.html", {"form": fileUploadForm})
 
 
-def search(request):
-    """Search for torrent files with optional category filtering"""
+def search_queryset(request):
+    """The files matching the search request, with the selected category (or None)"""
     query = request.GET.get('q', '')
     category_id = request.GET.get('category', '')
-    
+
     # Start with all files
-    torrent_files = TorrentFile.objects.all()
+    torrent_files = TorrentFile.objects.listing()
     
-    # Apply text search filter if query is provided
+    # Apply full-text search if query is provided
     if query:
-        torrent_files = torrent_files.filter(name__icontains=query)
+        torrent_files = search_torrent_files(torrent_files, query)
     
     # Apply category filter if category is selected
     selected_category_obj = None
     if category_id:
-        try:
-            selected_category_obj = MtCategory.objects.get(id=category_id)
-            torrent_files = torrent_files.filter(category_id=category_id)
-        except MtCategory.DoesNotExist:
-            pass
-    
-    # Order by upload time (newest first)
-    torrent_files = torrent_files.order_by('-uploadTime')
+        selected_category_obj = category_registry.get(category_id)
+        if selected_category_obj is not None:
+            torrent_files = torrent_files.filter(category_id=selected_category_obj.id)
+
+    return torrent_files, selected_category_obj
+
+
+@cache_anonymous_listing
+@conditional_listing()
+def search(request):
+    """Search for torrent files with optional category filtering"""
+    query = request.GET.get('q', '')
+    category_id = request.GET.get('category', '')
+    torrent_files, selected_category_obj = search_queryset(request)
     
+    # Order by relevance when searching unless a sort was picked, otherwise newest first
+    sort, ordering = requested_sort(request, default=None if query else '-uploadTime')
+    if ordering is None:
+        ordering = ('-search_rank', '-uploadTime', '-id')
+    page_obj = KeysetPaginator(torrent_files, 20, ordering).get_page(request.GET.get('cursor'))
+    if page_obj.has_other_pages():
+        result_count, results_capped = capped_count(torrent_files)
+    else:
+        result_count, results_capped = len(page_obj), False
+    searches.inc(terms='yes' if query else 'no')
+    search_results.observe(len(page_obj))
+
     # Get all categories for the dropdown
-    categories = MtCategory.objects.all().order_by('name')
+    categories = category_registry.all()
     
     context = {
-        'tFiles': torrent_files,
+        'tFiles': page_obj,
+        'page_obj': page_obj,
+        'cursor_query': query_string_without(request, 'cursor'),
         'query': query,
+        'result_count': result_count,
+        'results_capped': results_capped,
         'selected_category': category_id,
         'selected_category_obj': selected_category_obj,
         'categories': categories,
+        'category_facets': category_facets(categories),
+        'sort': sort,
+        'sort_headers': sort_headers(request, sort),
+        'pagination_labels': pagination_labels(sort),
     }
     
     return render(request, 'search.html', context)
@@ -135,7 +178,7 @@ def edit_torrent_file(request, file_id):
     torrent_file = get_object_or_404(TorrentFile, id=file_id)
     
     # Check if the current user is the uploader
-    if torrent_file.uploader != request.user.username:
+    if not torrent_file.is_owned_by(request.user):
         raise Http404("You can only edit your own files")
     
     if request.method == "POST":
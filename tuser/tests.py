@@ -1,8 +1,12 @@
 from django.test import TestCase
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from files.models import TorrentFile
+
 # Create your tests here.
 
 class NumericPasswordTestCase(TestCase):
@@ -42,3 +46,31 @@ class NumericPasswordTestCase(TestCase):
         self.assertEqual(response.url, '/')
         # User should be created
         self.assertTrue(User.objects.filter(username='testuser3').exists())
+
+
+class ProfileListingTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='bob', password='testpass123')
+        TorrentFile.objects.create(name='Mine', uploader='bob', location='fopnu://file:/mine.mkv')
+        TorrentFile.objects.create(name='Not Mine', uploader='bobby', location='fopnu://file:/bobby.mkv')
+        TorrentFile.objects.create(name='Also Not Mine', uploader='Bob', location='fopnu://file:/bob-caps.mkv')
+
+    def test_profile_lists_only_own_links(self):
+        """Test that the profile matches the uploader exactly, not as a substring"""
+        self.client.login(username='bob', password='testpass123')
+        response = self.client.get(reverse('profile'))
+        self.assertEqual([f.name for f in response.context['tFiles']], ['Mine'])
+
+    def test_profile_query_uses_uploader_index(self):
+        """Test that the profile page's listing query is answered from the (uploader_user, uploadTime) index"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('query plan check is SQLite specific')
+        self.client.login(username='bob', password='testpass123')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('profile'))
+        sql, = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('SELECT "files_torrentfile"')]
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('files_uploader_user_time_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
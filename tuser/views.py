@@ -7,6 +7,7 @@ from django.contrib.auth.models import User
 from django.shortcuts import redirect, render
 
 from files.models import TorrentFile
+from files.pagination import KeysetPaginator, query_string_without
 
 
 def myLogin(request):
@@ -53,5 +54,10 @@ def signup(request):
 
 @login_required(login_url="/login/")
 def profile(request):
-    torrentFile = TorrentFile.objects.filter(uploader__icontains=request.user.username).order_by('-uploadTime')
-    return render(request, "profile.html", {"tFiles": torrentFile})
+    torrentFile = TorrentFile.objects.listing().owned_by(request.user)
+    page_obj = KeysetPaginator(torrentFile, 20).get_page(request.GET.get("cursor"))
+    return render(request, "profile.html", {
+        "tFiles": page_obj,
+        "page_obj": page_obj,
+        "cursor_query": query_string_without(request, "cursor"),
+    })
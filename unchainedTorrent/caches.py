@@ -0,0 +1,51 @@
+"""
+Cache configuration from the environment.
+
+CACHE_URL picks the backend:
+
+    locmem://name                          (one cache per process)
+    memcached://host:11211[,host2:11211]   (pymemcache)
+    pylibmc://host:11211[,host2:11211]
+    file:///absolute/path/to/cache/dir
+    db://cache_table_name                  (create it with `manage.py createcachetable`)
+    dummy://
+
+Besides rendered pages, the cache holds the version counters that tell every
+process a listing, category, token or suggestion changed (see files.signals),
+so a site served by more than one process needs a backend they share. With a
+process-local one each process only sees its own changes.
+"""
+from urllib.parse import unquote, urlsplit
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'pylibmc': 'django.core.cache.backends.memcached.PyLibMCCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+}
+
+PROCESS_LOCAL_BACKENDS = (BACKENDS['locmem'], BACKENDS['dummy'])
+
+
+def cache_from_env(environ, default_url, variable='CACHE_URL'):
+    """A CACHES entry built from ``environ[variable]``, falling back to ``default_url``."""
+    url = urlsplit(environ.get(variable) or default_url)
+    try:
+        backend = BACKENDS[url.scheme]
+    except KeyError:
+        raise ValueError('Unsupported %s scheme "%s"' % (variable, url.scheme))
+
+    if backend in (BACKENDS['memcached'], BACKENDS['pylibmc']):
+        location = url.netloc.split(',')
+    elif backend == BACKENDS['file']:
+        location = unquote(url.path)
+    else:
+        location = unquote(url.netloc + url.path)
+    return {'BACKEND': backend, 'LOCATION': location}
+
+
+def is_process_local(config):
+    """Whether each process gets its own copy of the cache ``config`` describes."""
+    return config['BACKEND'] in PROCESS_LOCAL_BACKENDS
@@ -0,0 +1,121 @@
+"""
+Per-request database instrumentation.
+
+QueryInstrumentationMiddleware wraps every database connection for the
+length of a request and records how many queries ran, the time spent in
+them and the slowest statement. Each request is logged to the
+``unchainedTorrent.instrumentation`` logger, with the numbers also passed as
+``extra`` fields for structured log handlers, and, when
+settings.SERVER_TIMING is on, reported in a Server-Timing header that
+browser dev tools display.
+
+settings.QUERY_BUDGETS caps the queries a GET or HEAD of a view may run, by
+URL name; writes vary too much with what is already stored. Going over is
+logged as a warning, or raises QueryBudgetExceeded when
+settings.QUERY_BUDGET_STRICT is on, which the test runner
+(unchainedTorrent.testing) makes it.
+"""
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Longest SQL kept for the slowest statement
+MAX_SQL_LENGTH = 500
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_sql = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if elapsed >= self.slowest_seconds:
+                self.slowest_seconds = elapsed
+                self.slowest_sql = sql[:MAX_SQL_LENGTH]
+
+
+def server_timing(stats, total_seconds):
+    """Server-Timing value: time in SQL, time elsewhere in the app (views and templates) and in total."""
+    return 'db;dur=%.1f;desc="%d queries", app;dur=%.1f, total;dur=%.1f' % (
+        stats.seconds * 1000, stats.count, (total_seconds - stats.seconds) * 1000, total_seconds * 1000,
+    )
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        started = time.perf_counter()
+        with self.instrument(stats):
+            response = self.get_response(request)
+        if response.streaming:
+            # The body runs queries of its own once this has returned, e.g. /api/links/import/
+            response.streaming_content = self.stream(response.streaming_content, request, response, stats, started)
+        else:
+            self.report(request, response, stats, started)
+        return response
+
+    def instrument(self, stats):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        return stack
+
+    def stream(self, content, request, response, stats, started):
+        with self.instrument(stats):
+            yield from content
+        self.report(request, response, stats, started)
+
+    def report(self, request, response, stats, started):
+        total_seconds = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.url_name if match else None
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'query_count': stats.count,
+            'sql_ms': round(stats.seconds * 1000, 2),
+            'app_ms': round((total_seconds - stats.seconds) * 1000, 2),
+            'total_ms': round(total_seconds * 1000, 2),
+            'slowest_sql_ms': round(stats.slowest_seconds * 1000, 2),
+            'slowest_sql': stats.slowest_sql,
+        }
+        logger.info(
+            '%(method)s %(path)s %(status)s: %(query_count)d queries, %(sql_ms).1fms SQL, '
+            '%(total_ms).1fms total', fields, extra=fields,
+        )
+        if settings.SERVER_TIMING and not response.streaming:
+            # A streamed response's headers are sent before its queries run
+            response['Server-Timing'] = server_timing(stats, total_seconds)
+
+        budget = settings.QUERY_BUDGETS.get(view) if request.method in ('GET', 'HEAD') else None
+        if budget is not None and stats.count > budget:
+            message = '%s ran %d queries, over its budget of %d; slowest: %s' % (
+                view, stats.count, budget, stats.slowest_sql,
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra=fields)
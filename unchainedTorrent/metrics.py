@@ -0,0 +1,226 @@
+"""
+Counters and histograms exposed at /metrics in the Prometheus text format.
+
+Recording is on the request path, so it takes no lock: every thread adds to
+its own dict of values and a scrape sums the dicts of all threads. When a
+thread ends its values are folded into a retired total, so servers that
+start a thread per connection do not pile up dicts. Values are per process;
+with several worker processes, scrape each of them.
+
+/metrics answers clients sending ``Authorization: Bearer <settings.METRICS_TOKEN>``
+and those connecting from an address in settings.METRICS_ALLOWED_IPS. With
+neither set it answers nobody: behind a reverse proxy on the same host every
+client seems to come from loopback, so no address is trusted by default.
+
+MetricsMiddleware times every request by URL name; the link, search and
+cache metrics are defined in files.metrics.
+"""
+import bisect
+import hmac
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=()):
+    pairs = ['%s="%s"' % (name, escape(value)) for name, value in zip(names, values)]
+    pairs.extend('%s="%s"' % pair for pair in extra)
+    return '{%s}' % ','.join(pairs) if pairs else ''
+
+
+class ShardOwner:
+    """Lives in one thread's local storage and is freed when the thread ends."""
+    __slots__ = ('values', '__weakref__')
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._shards = {}
+        self._retired = {}
+        # Reentrant: a thread's values may be retired by a collection inside a locked section
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError('Metric %s is already registered' % metric.name)
+            self._metrics[metric.name] = metric
+
+    def shard(self):
+        """This thread's values: {(metric name, label values): value}."""
+        try:
+            return self._local.owner.values
+        except AttributeError:
+            owner = self._local.owner = ShardOwner()
+            values = owner.values = {}
+            with self._lock:
+                self._shards[id(values)] = values
+            weakref.finalize(owner, self._retire, values)
+            return values
+
+    def _retire(self, values):
+        """Fold the values of a thread that has ended into the retired total."""
+        with self._lock:
+            del self._shards[id(values)]
+            self._add(self._retired, values)
+
+    def _add(self, total, values):
+        for key, value in list(values.items()):
+            if key in total:
+                total[key] = self._metrics[key[0]].merge(total[key], value)
+            else:
+                total[key] = self._metrics[key[0]].copy(value)
+
+    def shard_count(self):
+        with self._lock:
+            return len(self._shards)
+
+    def collect(self):
+        """{metric name: {label values: value}} summed over every thread, past and present."""
+        totals = {}
+        with self._lock:
+            self._add(totals, self._retired)
+            shards = list(self._shards.values())
+        for shard in shards:
+            self._add(totals, shard)
+        merged = {}
+        for (name, labels), value in totals.items():
+            merged.setdefault(name, {})[labels] = value
+        return merged
+
+    def render(self):
+        merged = self.collect()
+        lines = []
+        for metric in self._metrics.values():
+            lines.append('# HELP %s %s' % (metric.name, metric.documentation))
+            lines.append('# TYPE %s %s' % (metric.name, metric.type))
+            for labels, value in sorted(merged.get(metric.name, {}).items()):
+                lines.extend(metric.samples(labels, value))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        registry.register(self)
+
+    def key(self, labels):
+        return self.name, tuple(str(labels[name]) for name in self.labelnames)
+
+    def value(self, **labels):
+        """Current value for ``labels`` summed over every thread (for tests and debugging)."""
+        return self.registry.collect().get(self.name, {}).get(self.key(labels)[1])
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        values = self.registry.shard()
+        key = self.key(labels)
+        values[key] = values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return super().value(**labels) or 0
+
+    def copy(self, value):
+        return value
+
+    def merge(self, total, value):
+        return total + value
+
+    def samples(self, labels, value):
+        yield '%s%s %s' % (self.name, format_labels(self.labelnames, labels), value)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, amount, **labels):
+        values = self.registry.shard()
+        key = self.key(labels)
+        counts = values.get(key)
+        if counts is None:
+            # One count per bucket, one for +Inf, then the sum
+            counts = values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, amount)] += 1
+        counts[-1] += amount
+
+    def copy(self, value):
+        return list(value)
+
+    def merge(self, total, value):
+        return [a + b for a, b in zip(total, value)]
+
+    def count(self, **labels):
+        value = self.value(**labels)
+        return sum(value[:-1]) if value else 0
+
+    def samples(self, labels, value):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), value):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(float(bound))
+            yield '%s_bucket%s %d' % (self.name, format_labels(self.labelnames, labels, [('le', le)]), cumulative)
+        yield '%s_sum%s %r' % (self.name, format_labels(self.labelnames, labels), value[-1])
+        yield '%s_count%s %d' % (self.name, format_labels(self.labelnames, labels), cumulative)
+
+
+request_duration = Histogram(
+    'nulinks_http_request_duration_seconds', 'Time to answer a request, by URL name.',
+    ['view', 'method', 'status'],
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        request_duration.observe(
+            time.perf_counter() - started,
+            view=match.url_name if match and match.url_name else 'unmatched',
+            method=request.method,
+            status='%dxx' % (response.status_code // 100),
+        )
+        return response
+
+
+def scrape_allowed(request):
+    token = settings.METRICS_TOKEN
+    if token and hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), 'Bearer ' + token):
+        return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    if not scrape_allowed(request):
+        raise Http404
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
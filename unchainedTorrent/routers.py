@@ -0,0 +1,98 @@
+"""
+Primary/replica routing for the link tables.
+
+Reads of the ``files`` app's models go to one of the aliases in
+settings.DATABASE_REPLICAS; everything else, and every write, uses the
+primary. Authentication, sessions and tokens stay on the primary so a login
+is usable as soon as it is made, and so does the queue of ?async=1
+submissions, which workers claim and clients poll.
+
+Replicas lag, so once a request writes, the rest of it reads from the
+primary, and ReplicaPinningMiddleware keeps that client on the primary for
+REPLICA_PIN_SECONDS afterwards (long enough for the redirect after an
+upload to show the new link). The same bound limits how long anything
+built from a replica read may be cached.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'pin_primary'
+REPLICATED_APPS = {'files'}
+PRIMARY_MODELS = {'files.linksubmission'}
+
+_state = threading.local()
+
+
+def pin_to_primary():
+    """Send this thread's reads to the primary until the next request starts."""
+    _state.pinned = True
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def reads_from_primary():
+    """
+    Whether this thread's reads see every committed write. Anything cached
+    under a version bumped by a write must only be built from such reads, or
+    be kept no longer than replicas lag.
+    """
+    return not settings.DATABASE_REPLICAS or is_pinned()
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or model._meta.app_label not in REPLICATED_APPS:
+            return None
+        if model._meta.label_lower in PRIMARY_MODELS:
+            return DEFAULT_DB_ALIAS
+        if is_pinned() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+
+
+class ReplicaPinningMiddleware:
+    """
+    Pins a client to the primary for a while after one of its requests wrote.
+    A streamed response, like /api/links/import/, writes after the headers
+    are sent, so every request with a writing method pins the client up front
+    and its stream reads from the primary too.
+    """
+    WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.pinned = PIN_COOKIE in request.COOKIES
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            if _state.wrote or request.method in self.WRITE_METHODS:
+                response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True)
+            if response.streaming:
+                response.streaming_content = self.stream(response.streaming_content, is_pinned())
+            return response
+        finally:
+            _state.pinned = _state.wrote = False
+
+    def stream(self, content, pinned):
+        _state.pinned = pinned
+        try:
+            yield from content
+        finally:
+            _state.pinned = _state.wrote = False
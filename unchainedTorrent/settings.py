@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/1.10/ref/settings/
 
 import os
 
+from unchainedTorrent.caches import cache_from_env, is_process_local
+from unchainedTorrent.database import database_from_env, env_flag, replicas_from_env
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -44,6 +47,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'unchainedTorrent.metrics.MetricsMiddleware',
+    'unchainedTorrent.routers.ReplicaPinningMiddleware',
+    'unchainedTorrent.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'files.throttling.RateLimitHeadersMiddleware',
 ]
 
 ROOT_URLCONF = 'unchainedTorrent.urls'
@@ -74,17 +81,46 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'unchainedTorrent.wsgi.application'
 
+# Empties the throttle cache before each test; see unchainedTorrent/testing.py
+TEST_RUNNER = 'unchainedTorrent.testing.TestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/1.10/ref/settings/#databases
+# Set DATABASE_URL (and optionally DATABASE_CONN_MAX_AGE and
+# DATABASE_CONN_HEALTH_CHECKS) to override; see unchainedTorrent/database.py.
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    'default': database_from_env(os.environ, 'sqlite:///' + os.path.join(BASE_DIR, 'db.sqlite3')),
+    **replicas_from_env(os.environ),
 }
 
+# Aliases that serve reads of the link tables; writes always go to 'default'
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['unchainedTorrent.routers.PrimaryReplicaRouter']
+
+# How long a client reads from the primary after it wrote, to cover replica lag
+REPLICA_PIN_SECONDS = 15
+
+
+# Caches
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Set CACHE_URL to a cache every process shares, e.g. memcached://127.0.0.1:11211,
+# when running more than one; see unchainedTorrent/caches.py.
+
+CACHES = {
+    'default': cache_from_env(os.environ, 'locmem://nulinks'),
+    # Throttle buckets (files.throttling); THROTTLE_CACHE_URL defaults to CACHE_URL
+    'throttle': cache_from_env(os.environ, os.environ.get('CACHE_URL') or 'locmem://throttle', 'THROTTLE_CACHE_URL'),
+}
+THROTTLE_CACHE_ALIAS = 'throttle'
+
+# Cache holding rendered anonymous home and search pages. Entries are
+# invalidated by TorrentFile/MtCategory changes, so a shared cache needs no
+# timeout; a process-local one never hears of other processes' changes.
+LISTING_CACHE_ALIAS = 'default'
+LISTING_CACHE_TIMEOUT = 60 if is_process_local(CACHES[LISTING_CACHE_ALIAS]) else None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.10/ref/settings/#auth-password-validators
@@ -133,7 +169,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'files.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -141,8 +177,75 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    # Token buckets for the posting endpoints (files.throttling), per token and per client IP
+    'DEFAULT_THROTTLE_RATES': {
+        'link_post': '60/min',
+        'link_post_ip': '120/min',
+        'link_bulk': '10/min',
+        'link_bulk_ip': '20/min',
+        # Search box suggestions, one request per keystroke
+        'suggest_ip': '600/min',
+    },
+    # Reverse proxies in front of the app. The per-IP buckets take the client address from
+    # X-Forwarded-For only this many hops back; 0 uses REMOTE_ADDR, so clients can't pick their bucket.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', '0')),
+}
+
+# Per-process cache of API tokens (files.authentication): entries and seconds each is trusted
+TOKEN_AUTH_CACHE_SIZE = 1024
+TOKEN_AUTH_CACHE_TTL = 60
+
+# Most links accepted by one POST to /api/links/bulk/
+BULK_LINKS_MAX_BATCH = 1000
+
+# Links committed per transaction by the streaming /api/links/import/ endpoint
+LINK_IMPORT_CHUNK_SIZE = 500
+
+# Queued ?async=1 submissions imported per transaction by process_link_submissions
+LINK_SUBMISSION_BATCH_SIZE = 50
+
+# Most recent links whose names /api/suggest/ completes from (files.suggest), per process
+SUGGEST_MAX_LINKS = 50000
+
+# Who may scrape /metrics: Prometheus sending this bearer token, or clients connecting from these
+# addresses (comma-separated). Neither is set by default, which leaves /metrics closed.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+
+# Per-request query counts and SQL time (unchainedTorrent.instrumentation): send
+# them in a Server-Timing header, and cap the queries a GET of the busiest views
+# may run, by URL name. Going over is logged, or fails outright with
+# QUERY_BUDGET_STRICT, which the test runner turns on.
+SERVER_TIMING = env_flag(os.environ.get('SERVER_TIMING'), DEBUG)
+QUERY_BUDGETS = {
+    'home': 8,
+    'search': 8,
+    'profile': 6,
+    'api_links': 4,
+    'api_categories': 2,
+    'api_suggest': 2,
+}
+QUERY_BUDGET_STRICT = env_flag(os.environ.get('QUERY_BUDGET_STRICT'), False)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # INFO logs every request's query count and timings
+        'unchainedTorrent.instrumentation': {
+            'handlers': ['console'],
+            'level': os.environ.get('QUERY_LOG_LEVEL', 'WARNING'),
+        },
+    },
 }
 
 # Email settings for password recovery
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@nulinks.local'
+
+# Full-text search backend for the search page (dotted path to a class in
+# files.search). Leave unset to pick one from the database vendor.
+SEARCH_BACKEND = None
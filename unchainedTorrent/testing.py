@@ -0,0 +1,36 @@
+"""
+Test runner for ``manage.py test`` (settings.TEST_RUNNER).
+
+It turns QUERY_BUDGET_STRICT on, so a view going over its query budget
+fails the test that requested it. And since every test client posts from
+127.0.0.1, the per-IP throttle buckets (files.throttling) would carry over
+from one test to the next, so it empties the throttle cache before each
+test instead of every test class doing it.
+"""
+import unittest
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class ThrottleResetMixin:
+    def startTest(self, test):
+        caches[settings.THROTTLE_CACHE_ALIAS].clear()
+        super().startTest(test)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.strict_budgets = override_settings(QUERY_BUDGET_STRICT=True)
+        self.strict_budgets.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.strict_budgets.disable()
+        super().teardown_test_environment(**kwargs)
+
+    def get_resultclass(self):
+        base = super().get_resultclass() or unittest.TextTestResult
+        return type('ThrottleResetResult', (ThrottleResetMixin, base), {})
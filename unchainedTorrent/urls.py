@@ -21,6 +21,7 @@ from django.contrib.auth import views as auth_views
 # for signup
 from tuser import views as userViews
 from files import views as viewsFiles
+from unchainedTorrent.metrics import metrics_view
 
 # for media
 from django.conf import settings
@@ -52,6 +53,7 @@ urlpatterns = [
 
     # API URLs
     url(r'^api/', include('files.api_urls')),
+    url(r'^metrics$', metrics_view, name='metrics'),
 
     # url(r'^search(?P<q>[0-9a-zA-Z+-_]+)', viewsFiles.search, name='search'),
 